@@ -19,26 +19,52 @@ Environment Variables:
   - NFC_BAUD_RATE: Baudrate (default: 115200)
   - NFC_TAP_DEBOUNCE_MS: Debounce window in ms (default: 1000)
   - NFC_DEDUP_BUFFER_SIZE: UID dedup buffer size (default: 10)
+  - NFC_SCAN_TIMEOUT_MS: Per-command PN532 scan timeout in ms (default: 100, min: 50)
 """
 
 import os
 import sys
 import time
 import json
+import queue
 import signal
+import selectors
+import threading
 import serial
-from collections import deque
+from collections import OrderedDict
 from adafruit_pn532.uart import PN532_UART
+from pn532_raw import PN532Fast, PN532ProtocolError
 
 # Timing constants (extracted magic numbers)
 SERIAL_TIMEOUT_S = 1.0
 SIGNAL_STABILIZE_DELAY_S = 0.2
-NFC_SCAN_TIMEOUT_S = 0.5
+DEFAULT_SCAN_TIMEOUT_MS = 100  # Short timeout so the PN532 is re-armed quickly
+MIN_SCAN_TIMEOUT_MS = 50
+NS_PER_S = 1_000_000_000
+WRITER_DRAIN_TIMEOUT_S = 1.0  # Max wait for queued events to reach stdout on exit
 HEARTBEAT_INTERVAL_S = 30
-BACKOFF_CHECK_INTERVAL_S = 0.5  # Check shutdown/heartbeat during backoff
+CARD_WAIT_INTERVAL_S = 0.5  # Check shutdown/heartbeat while waiting for a card
+REARM_INTERVAL_S = 10  # Abort and re-issue an InListPassiveTarget pending this long
+
+# Host ACK frame - aborts the command the PN532 is currently processing
+PN532_ACK_FRAME = b'\x00\x00\xFF\x00\xFF\x00'
 
 # Reconnection settings
 MAX_RETRIES = 5
+MAX_RESYNCS = 3  # Consecutive in-place protocol recoveries before a full reconnect
+
+# Compact JSON encoding for IPC (fewer bytes through the pipe for Node to parse)
+JSON_SEPARATORS = (',', ':')
+
+# Pre-encoded envelopes for the steady-state events (heartbeat, tap).
+# Byte-identical to json.dumps(..., separators=JSON_SEPARATORS); the only
+# variable parts are an int timestamp and a hex UID, which need no escaping.
+HEARTBEAT_EVENT_PREFIX = '{"event":"heartbeat","timestamp":'
+TAP_EVENT_PREFIX = '{"event":"tap","timestamp":'
+
+# Flush stdout on every newline so each event reaches Node with a single write,
+# without an explicit flush() per event (stdout is a pipe, not a TTY)
+sys.stdout.reconfigure(line_buffering=True, write_through=True)
 
 
 class NFCReader:
@@ -47,11 +73,16 @@ class NFCReader:
     Encapsulates state and provides clean separation of concerns.
     """
 
+    # Fixed attribute set: no per-instance __dict__, faster attribute access
+    __slots__ = (
+        'config', 'shutdown_requested', 'fatal_exit', 'retry_count',
+        'uart', 'pn532', 'pn532_fast',
+        '_tx_queue', '_tx_thread', '_wake_r', '_wake_w',
+        'recent_taps', '_debounce_s', 'last_heartbeat',
+    )
+
     def __init__(self):
         """Initialize NFC reader with configuration from environment"""
-        # Load and validate configuration
-        self.config = self._load_config()
-
         # State management
         self.shutdown_requested = False
         self.fatal_exit = False
@@ -60,9 +91,32 @@ class NFCReader:
         # Resource handles
         self.uart = None
         self.pn532 = None
+        self.pn532_fast = None
+
+        # Stdout writer thread, so a slow Node parent never stalls the scan loop
+        self._tx_queue = queue.SimpleQueue()
+        self._tx_thread = threading.Thread(target=self._writer_loop, name='nfc-stdout', daemon=True)
+        self._tx_thread.start()
+
+        # Self-pipe so a shutdown signal wakes blocking waits immediately.
+        # The interpreter writes the signal number to it (set_wakeup_fd), so
+        # the handler itself needs no I/O.
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+
+        # Register signal handlers before anything that can block or fail,
+        # so a signal during startup still produces a shutdown event
+        signal.set_wakeup_fd(self._wake_w)
+        signal.signal(signal.SIGINT, self._handle_shutdown)
+        signal.signal(signal.SIGTERM, self._handle_shutdown)
 
-        # UID deduplication buffer
-        self.recent_taps = deque(maxlen=self.config['dedup_buffer_size'])
+        # Load and validate configuration
+        self.config = self._load_config()
+
+        # UID deduplication buffer (uid_hex -> last tap time, oldest first)
+        self.recent_taps = OrderedDict()
+        self._debounce_s = self.config['debounce_ms'] / 1000
 
         # Heartbeat tracking (use monotonic time for intervals)
         self.last_heartbeat = time.monotonic()
@@ -78,22 +132,49 @@ class NFCReader:
                 'port': port,
                 'baud_rate': int(os.getenv('NFC_BAUD_RATE', '115200')),
                 'debounce_ms': int(os.getenv('NFC_TAP_DEBOUNCE_MS', '1000')),
-                'dedup_buffer_size': int(os.getenv('NFC_DEDUP_BUFFER_SIZE', '10'))
+                'dedup_buffer_size': int(os.getenv('NFC_DEDUP_BUFFER_SIZE', '10')),
+                'scan_timeout_s': max(int(os.getenv('NFC_SCAN_TIMEOUT_MS', str(DEFAULT_SCAN_TIMEOUT_MS))),
+                                      MIN_SCAN_TIMEOUT_MS) / 1000
             }
         except ValueError as e:
             self._emit_event('error',
                            message=f"Configuration error: {e}",
                            fatal=True)
+            self._stop_writer()
             sys.exit(1)
 
     def _emit_event(self, event_type, **data):
         """Output JSON event to stdout (Node.js reads this)"""
         event = {
             "event": event_type,
-            "timestamp": int(time.time()),  # Wall clock time for timestamps
+            "timestamp": time.time_ns() // NS_PER_S,  # Wall clock time for timestamps
             **data
         }
-        print(json.dumps(event), flush=True)
+        self._tx_queue.put(json.dumps(event, separators=JSON_SEPARATORS) + '\n')
+
+    def _emit_heartbeat(self):
+        """Output heartbeat event using the pre-encoded envelope"""
+        self._tx_queue.put(f"{HEARTBEAT_EVENT_PREFIX}{time.time_ns() // NS_PER_S}}}\n")
+
+    def _emit_tap(self, uid_hex):
+        """Output tap event using the pre-encoded envelope"""
+        self._tx_queue.put(f'{TAP_EVENT_PREFIX}{time.time_ns() // NS_PER_S},"uid":"{uid_hex}"}}\n')
+
+    def _writer_loop(self):
+        """Write queued event lines to stdout until the None sentinel arrives"""
+        while True:
+            line = self._tx_queue.get()
+            if line is None:
+                break
+            try:
+                sys.stdout.write(line)
+            except (BrokenPipeError, ValueError):
+                break  # Node closed the pipe, nothing left to deliver to
+
+    def _stop_writer(self):
+        """Flush queued events to stdout and stop the writer thread"""
+        self._tx_queue.put(None)
+        self._tx_thread.join(timeout=WRITER_DRAIN_TIMEOUT_S)
 
     def _log_debug(self, message):
         """Output debug info to stderr (doesn't interfere with IPC)"""
@@ -110,6 +191,7 @@ class NFCReader:
         finally:
             self.uart = None
             self.pn532 = None
+            self.pn532_fast = None
 
     def _handle_shutdown(self, signum, frame):
         """
@@ -123,40 +205,52 @@ class NFCReader:
         self._log_debug(f'Shutdown signal {signum} received')
         # Don't call sys.exit() here - let main loop cleanup and exit
 
-    def _is_duplicate_tap(self, uid_hex):
+    def _is_duplicate_tap(self, uid_hex, now):
         """Check if this UID was tapped recently (within debounce window)"""
-        now = time.monotonic()  # Use monotonic time for interval measurement
-        for tap in self.recent_taps:
-            if tap['uid'] == uid_hex and (now - tap['time']) < self.config['debounce_ms'] / 1000:
-                return True
-        return False
-
-    def _record_tap(self, uid_hex):
-        """Record this tap in deduplication buffer"""
-        self.recent_taps.append({
-            'uid': uid_hex,
-            'time': time.monotonic()  # Use monotonic time for interval measurement
-        })
+        last_tap = self.recent_taps.get(uid_hex)
+        return last_tap is not None and (now - last_tap) < self._debounce_s
+
+    def _record_tap(self, uid_hex, now):
+        """Record this tap in deduplication buffer, evicting expired and excess UIDs"""
+        recent_taps = self.recent_taps
+        recent_taps[uid_hex] = now
+        recent_taps.move_to_end(uid_hex)
+
+        # Entries are ordered by tap time, so expired ones are always at the front
+        max_size = self.config['dedup_buffer_size']
+        while recent_taps:
+            oldest_uid = next(iter(recent_taps))
+            if len(recent_taps) <= max_size and now - recent_taps[oldest_uid] < self._debounce_s:
+                break
+            del recent_taps[oldest_uid]
 
     def _send_heartbeat_if_needed(self):
         """Send heartbeat event every 30 seconds to prove process is alive"""
         now = time.monotonic()  # Use monotonic time for interval measurement
         if now - self.last_heartbeat >= HEARTBEAT_INTERVAL_S:
-            self._emit_event('heartbeat')
+            self._emit_heartbeat()
             self.last_heartbeat = now
 
     def _interruptible_sleep(self, total_seconds):
         """
-        Sleep in short intervals, allowing heartbeat emission and shutdown checks.
+        Sleep until total_seconds elapse, waking early on shutdown (via the
+        self-pipe) and whenever a heartbeat is due.
         Returns True if sleep completed, False if interrupted by shutdown.
         """
-        end_time = time.monotonic() + total_seconds
-        while time.monotonic() < end_time and not self.shutdown_requested:
-            # Sleep in short bursts
-            remaining = end_time - time.monotonic()
-            time.sleep(min(BACKOFF_CHECK_INTERVAL_S, remaining))
-            # Send heartbeat during long waits
-            self._send_heartbeat_if_needed()
+        monotonic = time.monotonic
+        end_time = monotonic() + total_seconds
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            while not self.shutdown_requested:
+                now = monotonic()
+                remaining = end_time - now
+                if remaining <= 0:
+                    break
+                # Wake no later than the next heartbeat is due
+                until_heartbeat = HEARTBEAT_INTERVAL_S - (now - self.last_heartbeat)
+                selector.select(timeout=max(0, min(remaining, until_heartbeat)))
+                # Send heartbeat during long waits
+                self._send_heartbeat_if_needed()
         return not self.shutdown_requested
 
     def _handle_retry(self, error_type, error_message):
@@ -185,6 +279,18 @@ class NFCReader:
 
         return True
 
+    def _resync_pn532(self, error):
+        """
+        Recover from a garbled frame without reopening the port.
+        Aborts any pending command, discards buffered bytes and re-issues
+        SAM configuration; errors raised here fall through to run()'s
+        full reconnect path.
+        """
+        self._log_debug(f"PN532 protocol error, resyncing: {error}")
+        self.uart.write(PN532_ACK_FRAME)
+        self.uart.reset_input_buffer()
+        self.pn532.SAM_configuration()
+
     def _initialize_hardware(self):
         """
         Initialize PN532 hardware and return firmware version.
@@ -211,40 +317,92 @@ class NFCReader:
         ic, ver, rev, support = self.pn532.firmware_version
         firmware_str = f"{ver}.{rev}"
 
+        # Raw-frame driver for the scan hot path (exact-length reads, no polling)
+        self.pn532_fast = PN532Fast(self.uart)
+
         return firmware_str
 
     def _scan_loop(self):
-        """Main NFC scanning loop - runs until shutdown or error"""
-        while not self.shutdown_requested:
-            # Check for heartbeat
-            self._send_heartbeat_if_needed()
+        """
+        Main NFC scanning loop - runs until shutdown or error.
+
+        Event-driven rather than polled: the PN532 is armed once with
+        InListPassiveTarget and only answers (on the UART) when a card enters
+        the field, so the loop sleeps in select() on the serial fd until the
+        response arrives instead of re-issuing timed reads. A select pending
+        longer than REARM_INTERVAL_S is aborted and re-issued, so a PN532
+        stuck in its (infinite) passive activation cannot stall detection.
+        """
+        # Bind hot-path callables/constants to locals (LOAD_FAST vs global + attribute lookups)
+        send_heartbeat = self._send_heartbeat_if_needed
+        listen_for_passive_target = self.pn532_fast.listen_for_passive_target
+        get_passive_target = self.pn532_fast.get_passive_target
+        scan_timeout = self.config['scan_timeout_s']
+        monotonic = time.monotonic
+
+        selector = selectors.DefaultSelector()
+        selector.register(self.uart, selectors.EVENT_READ)
+        selector.register(self._wake_r, selectors.EVENT_READ)  # Shutdown signal
+        armed = False
+        armed_at = 0.0
+        resyncs = 0
 
-            # Scan for ISO14443A devices (phones, payment cards, tags)
-            uid = self.pn532.read_passive_target(timeout=NFC_SCAN_TIMEOUT_S)
+        try:
+            while not self.shutdown_requested:
+                # Check for heartbeat
+                send_heartbeat()
+
+                try:
+                    # Arm PN532 to detect ISO14443A devices (phones, payment cards, tags)
+                    if not armed:
+                        armed = listen_for_passive_target(timeout=scan_timeout)
+                        if not armed:
+                            continue
+                        armed_at = monotonic()
+
+                    # Wait for the PN532 to report a card (data on the UART)
+                    # or a shutdown signal (loop condition re-checks the flag)
+                    if not selector.select(timeout=CARD_WAIT_INTERVAL_S) or self.shutdown_requested:
+                        if monotonic() - armed_at >= REARM_INTERVAL_S:
+                            self.uart.write(PN532_ACK_FRAME)
+                            armed = False
+                        continue
+
+                    armed = False
+                    uid = get_passive_target(timeout=scan_timeout)
+                    resyncs = 0
+                except PN532ProtocolError as e:
+                    # The port is fine, only the frame stream is out of step:
+                    # resync in place rather than close, back off and reopen
+                    armed = False
+                    resyncs += 1
+                    if resyncs > MAX_RESYNCS:
+                        raise
+                    self._resync_pn532(e)
+                    continue
 
-            if uid:
-                # Convert UID bytes to hex string (Python 3.5+ built-in)
-                uid_hex = uid.hex().upper()
+                if uid:
+                    # Convert UID bytes to hex string (Python 3.5+ built-in)
+                    uid_hex = uid.hex().upper()
+                    now = monotonic()  # One clock read for both debounce check and record
 
-                # Check for duplicate (debouncing)
-                if self._is_duplicate_tap(uid_hex):
-                    self._log_debug(f"Debounced re-tap: {uid_hex}")
-                    continue
+                    # Check for duplicate (debouncing)
+                    if self._is_duplicate_tap(uid_hex, now):
+                        self._log_debug(f"Debounced re-tap: {uid_hex}")
+                        continue
 
-                # Record and emit tap event
-                self._record_tap(uid_hex)
-                self._emit_event('tap', uid=uid_hex)
-                self._log_debug(f"Tap detected: {uid_hex}")
+                    # Record and emit tap event
+                    self._record_tap(uid_hex, now)
+                    self._emit_tap(uid_hex)
+                    self._log_debug(f"Tap detected: {uid_hex}")
+        finally:
+            selector.close()
 
     def run(self):
         """
         Main application loop with reconnection logic.
         Handles initialization, scanning, and graceful shutdown.
         """
-        # Register signal handlers
-        signal.signal(signal.SIGINT, self._handle_shutdown)
-        signal.signal(signal.SIGTERM, self._handle_shutdown)
-
         # Main connection/retry loop
         while self.retry_count < MAX_RETRIES and not self.shutdown_requested:
             try:
@@ -280,6 +438,7 @@ class NFCReader:
         # Exit with appropriate code
         exit_code = 1 if (self.fatal_exit or self.retry_count >= MAX_RETRIES) else 0
         self._log_debug(f"Exiting with code {exit_code}")
+        self._stop_writer()
         sys.exit(exit_code)
 
 
@@ -0,0 +1,146 @@
+"""
+FastPay PN532 Raw Frame Helpers
+
+Direct PN532 frame I/O over a pyserial port for the tap-detection hot path.
+The Adafruit driver is still used for initialization (wakeup, SAM config,
+firmware version); this module only replaces the InListPassiveTarget
+exchange that runs on every scan.
+
+Why bypass the driver here:
+  - Adafruit's get_passive_target() reads a fixed 73-byte frame, so every
+    tap blocks for the full serial timeout waiting for bytes that never come
+  - Its _wait_ready() polls in_waiting with 10 ms sleeps
+  - Frames for fixed commands are rebuilt on every call
+"""
+
+import select
+
+# Frame markers
+PREAMBLE = b'\x00\x00\xFF'
+START_CODE = b'\x00\xFF'
+ACK_FRAME = b'\x00\x00\xFF\x00\xFF\x00'
+
+# Frame identifiers
+HOST_TO_PN532 = 0xD4
+PN532_TO_HOST = 0xD5
+
+# Commands
+COMMAND_INLISTPASSIVETARGET = 0x4A
+
+# Baud modulation type for InListPassiveTarget
+MIFARE_ISO14443A = 0x00
+
+# Longest UID get_passive_target() accepts (matches adafruit_pn532)
+MAX_UID_LENGTH = 7
+
+
+class PN532ProtocolError(RuntimeError):
+    """
+    Malformed or unexpected frame from the PN532 (bad checksum, missing ACK).
+    Distinct from a timeout, which is reported as a False/None return; the
+    link is still up, so callers can resync in place instead of reconnecting.
+    """
+
+
+def build_frame(command, params=b''):
+    """Build a host-to-PN532 information frame for a command"""
+    data = bytes([HOST_TO_PN532, command]) + bytes(params)
+    length = len(data)
+    return (PREAMBLE
+            + bytes([length, (~length + 1) & 0xFF])
+            + data
+            + bytes([(~sum(data) + 1) & 0xFF, 0x00]))
+
+
+# Fixed command frames, built once at import
+INLISTPASSIVETARGET_FRAME = build_frame(COMMAND_INLISTPASSIVETARGET, [0x01, MIFARE_ISO14443A])
+
+
+class PN532Fast:
+    """
+    Minimal PN532 tap-detection driver working on raw frames.
+    Same call shape as adafruit_pn532's listen/get_passive_target.
+    """
+
+    def __init__(self, uart):
+        """Wrap an open pyserial port already initialized by PN532_UART"""
+        self._uart = uart
+
+    def _wait_ready(self, timeout):
+        """Block until the PN532 has sent data, up to timeout seconds"""
+        if self._uart.in_waiting:
+            return True
+        readable, _, _ = select.select([self._uart], [], [], timeout)
+        return bool(readable)
+
+    def _read_frame(self):
+        """
+        Read one information frame and return its data (TFI onward, no DCS).
+        Raises PN532ProtocolError (a RuntimeError, like adafruit_pn532) on
+        malformed frames.
+        """
+        uart = self._uart
+
+        # Sync on the start code (usually the first 5 bytes are 00 00 FF LEN LCS)
+        buf = bytearray(uart.read(len(PREAMBLE) + 2))
+        while True:
+            start = buf.find(START_CODE)
+            if start >= 0 and len(buf) >= start + 4:
+                break
+            more = uart.read(1)
+            if not more:
+                raise PN532ProtocolError("Response frame preamble does not contain 0x00FF!")
+            buf += more
+
+        length = buf[start + 2]
+        if (length + buf[start + 3]) & 0xFF != 0:
+            raise PN532ProtocolError("Response length checksum did not match length!")
+
+        # Data + DCS + postamble, minus whatever already arrived with the header
+        body = buf[start + 4:]
+        missing = length + 2 - len(body)
+        if missing > 0:
+            body += uart.read(missing)
+        if len(body) < length + 1:
+            raise PN532ProtocolError("Response frame truncated!")
+
+        if sum(body[:length + 1]) & 0xFF != 0:
+            raise PN532ProtocolError("Response checksum did not match expected value!")
+        return body[:length]
+
+    def listen_for_passive_target(self, timeout=1):
+        """
+        Arm the PN532 to detect one ISO14443A target and wait for its ACK.
+        Returns True once the command is acknowledged, False on timeout.
+        The UID frame arrives later, when a card enters the field.
+        """
+        uart = self._uart
+        uart.reset_input_buffer()
+        uart.write(INLISTPASSIVETARGET_FRAME)
+        if not self._wait_ready(timeout):
+            return False
+        if uart.read(len(ACK_FRAME)) != ACK_FRAME:
+            raise PN532ProtocolError("Did not receive expected ACK from PN532!")
+        return True
+
+    def get_passive_target(self, timeout=1):
+        """
+        Read the InListPassiveTarget response and return the card UID.
+        Returns None if no (or zero) target is reported within timeout.
+        """
+        if not self._wait_ready(timeout):
+            return None
+        frame = self._read_frame()
+        if frame[0] != PN532_TO_HOST or frame[1] != COMMAND_INLISTPASSIVETARGET + 1:
+            raise PN532ProtocolError("Received unexpected command response!")
+
+        # NbTg, Tg, SENS_RES (2), SEL_RES, NFCIDLength, NFCID1...
+        response = frame[2:]
+        if not response or response[0] == 0x00:
+            return None
+        if response[0] != 0x01:
+            raise RuntimeError("More than one card detected!")
+        uid_length = response[5]
+        if uid_length > MAX_UID_LENGTH:
+            raise RuntimeError("Found card with unexpectedly long UID!")
+        return bytes(response[6:6 + uid_length])
@@ -101,7 +101,8 @@ export class NFCBridge extends EventEmitter {
       env.NFC_TAP_DEBOUNCE_MS = this.config.tapDebounceMs.toString();
     }
 
-    this.process = spawn(pythonExecutable, [scriptPath], {
+    // -O: skip assert checks (and __debug__ blocks) in the reader and its libraries
+    this.process = spawn(pythonExecutable, ['-O', scriptPath], {
       env,
       stdio: ['ignore', 'pipe', 'pipe'],  // stdin, stdout, stderr
     });
@@ -113,12 +114,15 @@ export class NFCBridge extends EventEmitter {
     // Parse JSON events from stdout (IPC)
     // Use buffering to handle partial data chunks
     this.process.stdout.on('data', (data) => {
-      this.buffer += data;
+      const buffer = this.buffer + data;
+      let lineStart = 0;
       let newlineIndex;
 
-      while ((newlineIndex = this.buffer.indexOf('\n')) !== -1) {
-        const line = this.buffer.substring(0, newlineIndex).trim();
-        this.buffer = this.buffer.substring(newlineIndex + 1);
+      // Scan from an offset and keep only the trailing partial line, rather
+      // than re-slicing the whole buffer after every event
+      while ((newlineIndex = buffer.indexOf('\n', lineStart)) !== -1) {
+        const line = buffer.substring(lineStart, newlineIndex).trim();
+        lineStart = newlineIndex + 1;
 
         if (line) {
           try {
@@ -138,6 +142,8 @@ export class NFCBridge extends EventEmitter {
           }
         }
       }
+
+      this.buffer = lineStart === 0 ? buffer : buffer.substring(lineStart);
     });
 
     // Log stderr (debug output from Python)
@@ -17,6 +17,19 @@ from nfc.tag.tt2 import Type2Tag
 # The serial port where the PN532 is connected.
 SERIAL_PORT = 'tty:usbserial-ABSCDY4Z'
 
+# At most one "Listening..." line per second, even if listen() returns early
+LISTEN_LOG_INTERVAL = 1.0
+
+# Request validity window
+PAYMENT_TTL_MS = 180_000
+
+def payment_times():
+    """Return (nonce, exp) as ms-since-epoch strings from one clock read"""
+    now_ms = time.time_ns() // 1_000_000
+    return str(now_ms), str(now_ms + PAYMENT_TTL_MS)
+
+payment_nonce, payment_exp = payment_times()
+
 # Payment request to send
 payment = {
     "v": 1,
@@ -29,8 +42,8 @@ payment = {
         "cur": "USD",
         "fiat": "5.00",
         "desc": "Grande Latte",
-        "nonce": str(int(time.time() * 1000)),
-        "exp": str(int((time.time() + 180) * 1000)),
+        "nonce": payment_nonce,
+        "exp": payment_exp,
         "tid": "term_001"
     },
     "sig": "mockSignatureBase64=="
@@ -69,60 +82,65 @@ class CardEmulator:
         print("(Press Ctrl+C to stop)")
         print()
 
+        # The tag image is the same for every tap, so build it once before listening
+        # Configure LocalTarget for NFC-A (Type 2 Tag emulation)
+        # This makes the PN532 act as a passive tag that responds to readers
+        target = nfc.clf.LocalTarget('106A')
+        target.sensf_res = b'\x01\xFE\xFF\xFF\xFF\xFF\xFF\xFF\xC0\xC1\xC2\xC3\xC4\xC5\xC6\xC7\xFF\xFF'
+        target.sens_res = b'\x00\x01'  # SENS_RES for Type 2
+        target.sel_res = b'\x00'  # SEL_RES for Type 2
+        target.sdd_res = b'\x08\x12\x34\x56'  # 4-byte UID
+
+        # NDEF data payload (will be requested by phone via READ commands)
+        # For Type 2 Tag, data is stored in memory pages
+        # We need to format this as Type 2 Tag memory structure
+
+        # Type 2 Tag memory structure:
+        # Pages 0-3: UID + lock bytes (read-only)
+        # Page 4+: NDEF TLV (Type-Length-Value) structure
+
+        # Create NDEF TLV structure
+        ndef_tlv = bytearray()
+        ndef_tlv.append(0x03)  # NDEF Message TLV type
+        if len(ndef_data) < 255:
+            ndef_tlv.append(len(ndef_data))  # Length (1 byte)
+        else:
+            ndef_tlv.append(0xFF)  # Extended length marker
+            ndef_tlv.append((len(ndef_data) >> 8) & 0xFF)  # Length MSB
+            ndef_tlv.append(len(ndef_data) & 0xFF)  # Length LSB
+        ndef_tlv.extend(ndef_data)  # NDEF message
+        ndef_tlv.append(0xFE)  # Terminator TLV
+
+        # Build complete tag memory (simulating 64 pages of 4 bytes each)
+        tag_memory = bytearray(64 * 4)
+
+        # Pages 0-3: UID and lock bytes
+        tag_memory[0:4] = b'\x08\x12\x34\x56'  # UID
+        tag_memory[4:8] = b'\x00\x00\x00\x00'  # Internal/Lock
+        tag_memory[8:12] = b'\xE1\x10\x06\x00'  # CC (Capability Container)
+        tag_memory[12:16] = b'\x00\x00\x00\x00'  # Lock bits
+
+        # Pages 4+: NDEF TLV data
+        tag_memory[16:16+len(ndef_tlv)] = ndef_tlv
+
+        # Store in target (nfcpy will serve this on READ commands)
+        target.tt2_data = bytes(tag_memory)
+
+        print(f"   Tag memory prepared: {len(tag_memory)} bytes")
+        print(f"   NDEF TLV size: {len(ndef_tlv)} bytes")
+        print()
+
         tap_count = 0
+        last_listen_log = 0.0
 
         try:
             self.clf = nfc.ContactlessFrontend(self.device_path)
 
             while True:
-                print(f"[{time.strftime('%H:%M:%S')}] Listening for phone tap...")
-
-                # Configure LocalTarget for NFC-A (Type 2 Tag emulation)
-                # This makes the PN532 act as a passive tag that responds to readers
-                target = nfc.clf.LocalTarget('106A')
-                target.sensf_res = bytearray.fromhex('01 FE FF FF FF FF FF FF C0 C1 C2 C3 C4 C5 C6 C7 FF FF')
-                target.sens_res = bytearray.fromhex('0001')  # SENS_RES for Type 2
-                target.sel_res = bytearray.fromhex('00')      # SEL_RES for Type 2
-                target.sdd_res = bytearray.fromhex('08123456')  # 4-byte UID
-
-                # NDEF data payload (will be requested by phone via READ commands)
-                # For Type 2 Tag, data is stored in memory pages
-                # We need to format this as Type 2 Tag memory structure
-
-                # Type 2 Tag memory structure:
-                # Pages 0-3: UID + lock bytes (read-only)
-                # Page 4+: NDEF TLV (Type-Length-Value) structure
-
-                # Create NDEF TLV structure
-                ndef_tlv = bytearray()
-                ndef_tlv.append(0x03)  # NDEF Message TLV type
-                if len(ndef_data) < 255:
-                    ndef_tlv.append(len(ndef_data))  # Length (1 byte)
-                else:
-                    ndef_tlv.append(0xFF)  # Extended length marker
-                    ndef_tlv.append((len(ndef_data) >> 8) & 0xFF)  # Length MSB
-                    ndef_tlv.append(len(ndef_data) & 0xFF)  # Length LSB
-                ndef_tlv.extend(ndef_data)  # NDEF message
-                ndef_tlv.append(0xFE)  # Terminator TLV
-
-                # Build complete tag memory (simulating 64 pages of 4 bytes each)
-                tag_memory = bytearray(64 * 4)
-
-                # Pages 0-3: UID and lock bytes
-                tag_memory[0:4] = bytearray.fromhex('08123456')  # UID
-                tag_memory[4:8] = bytearray.fromhex('00000000')  # Internal/Lock
-                tag_memory[8:12] = bytearray.fromhex('E1100600')  # CC (Capability Container)
-                tag_memory[12:16] = bytearray.fromhex('00000000')  # Lock bits
-
-                # Pages 4+: NDEF TLV data
-                tag_memory[16:16+len(ndef_tlv)] = ndef_tlv
-
-                # Store in target (nfcpy will serve this on READ commands)
-                target.tt2_data = bytes(tag_memory)
-
-                print(f"   Tag memory prepared: {len(tag_memory)} bytes")
-                print(f"   NDEF TLV size: {len(ndef_tlv)} bytes")
-                print()
+                now = time.monotonic()
+                if now - last_listen_log >= LISTEN_LOG_INTERVAL:
+                    last_listen_log = now
+                    print(f"[{time.strftime('%H:%M:%S')}] Listening for phone tap...")
 
                 # Listen as a target (card emulation mode)
                 result = self.clf.listen(target, timeout=30.0)
@@ -138,8 +156,6 @@ class CardEmulator:
                     print("=" * 60)
                     print()
 
-                time.sleep(0.5)
-
         except IOError as e:
             print(f"\n❌ Error: Could not connect to PN532 on {self.device_path}")
             print("   - Is the device connected and the port correct?")
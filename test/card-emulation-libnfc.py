@@ -9,8 +9,10 @@ the complex NFC protocol handling to the battle-tested libnfc library.
 This approach was found to be a reliable alternative to Python-native libraries.
 """
 import subprocess
+import selectors
 import time
 import atexit
+import os
 
 # Global variable to hold the emulator process
 emulator_process = None
@@ -43,7 +45,7 @@ def run_emulation():
             ['nfc-emulate-ndef', '-r', 'ndef:url:google.com'],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True
+            bufsize=0  # Raw pipes: we drain them with os.read() below
         )
 
         # Wait a moment for the process to initialize
@@ -51,7 +53,7 @@ def run_emulation():
 
         # Check if the process started correctly
         if emulator_process.poll() is not None:
-            stderr_output = emulator_process.stderr.read()
+            stderr_output = emulator_process.stderr.read().decode(errors='replace')
             raise RuntimeError(f"Failed to start nfc-emulate-tag. Error:\n{stderr_output}")
 
         print("📱 TAP YOUR PHONE NOW!")
@@ -59,11 +61,22 @@ def run_emulation():
         print("(Press Ctrl+C to stop)")
         
         # The nfc-emulate-tag process runs until terminated.
-        # We can monitor its output here if needed.
-        while True:
-            # Reading stdout can be used to check for interactions
-            # For now, we just wait.
-            time.sleep(1)
+        # Drain its output as it arrives: if nobody reads the pipes, they
+        # fill up (64 KiB) and the emulator blocks mid-tap on its next log write.
+        selector = selectors.DefaultSelector()
+        selector.register(emulator_process.stdout, selectors.EVENT_READ)
+        selector.register(emulator_process.stderr, selectors.EVENT_READ)
+
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, 4096)
+                if not data:
+                    selector.unregister(key.fileobj)  # EOF: emulator closed it
+                    continue
+                print(data.decode(errors='replace'), end='', flush=True)
+
+        emulator_process.wait()
+        print(f"\n⚠️  Emulator exited (code {emulator_process.returncode})")
 
     except FileNotFoundError:
         print("\n❌ Error: `nfc-emulate-tag` command not found.")
@@ -6,9 +6,37 @@ Implements TgInitAsTarget manually since Adafruit library doesn't have it
 import serial
 import json
 import time
+import selectors
+import os
+import struct
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+POST_RESET_DELAY = 0.05  # DTR/RTS settle time after opening the port
+HIGH_BAUDRATE = 921600  # Switched to after init (None = stay at BAUDRATE)
+BAUD_SWITCH_DELAY = 0.01  # Let the PN532 retune its UART after the switch
+DISCONNECT_TIMEOUT_MS = 20  # Silence after TgGetData = phone has left the field
+LISTEN_LOG_INTERVAL = 1.0  # At most one "Listening..." line per second
+VERBOSE = False  # Per-APDU trace (hex dumps + stdout I/O on the response path)
+
+# SetSerialBaudRate (0x10) codes, PN532 User Manual 7.2.8
+BAUDRATE_CODES = {230400: 0x05, 460800: 0x06, 921600: 0x07, 1288000: 0x08}
+
+ACK_FRAME = b'\x00\x00\xFF\x00\xFF\x00'
+
+# APDU status words
+SW_OK = b'\x90\x00'  # Success
+SW_NOT_SUPPORTED = b'\x6A\x82'  # Not supported
+SW_FILE_NOT_FOUND = b'\x6A\x82'  # SELECT of an unknown AID / file ID
+
+# NFC Forum Type 4 Tag identifiers
+NDEF_TAG_APP_AID = b'\xD2\x76\x00\x00\x85\x01\x01'  # NDEF Tag Application
+CC_FILE_ID = b'\xE1\x03'  # Capability Container
+NDEF_FILE_ID = b'\xE1\x04'  # NDEF file
+
+# Capability Container: CCLEN, mapping v2.0, MLe, MLc, NDEF File Control TLV
+# (file E104, max size 0x00FF, read-only)
+CC_FILE = b'\x00\x0F\x20\x00\x3B\x00\x34\x04\x06\xE1\x04\x00\xFF\x00\xFF'
 
 payment = {
     "v": 1,
@@ -19,131 +47,262 @@ payment = {
     "time": int(time.time())
 }
 
-def send_command(ser, command_code, params=None):
-    """Send PN532 command and return response"""
-    if params is None:
-        params = []
-
-    # Build frame
-    frame = bytearray([
-        0x00, 0x00, 0xFF,  # Preamble
-    ])
-
-    # Length
+def build_frame(command_code, params=b''):
+    """Build PN532 host-to-PN532 frame for a command"""
     length = len(params) + 2  # TFI + command
-    frame.append(length)
-    frame.append((~length + 1) & 0xFF)  # Length checksum
-
-    frame.append(0xD4)  # TFI (host to PN532)
-    frame.append(command_code)
-    frame.extend(params)
-
-    # Data checksum
-    dcs = (~(0xD4 + command_code + sum(params)) + 1) & 0xFF
-    frame.append(dcs)
-    frame.append(0x00)  # Postamble
-
-    # Send
-    ser.reset_input_buffer()
+    dcs = (-(0xD4 + command_code + sum(params))) & 0xFF  # Data checksum
+
+    # One concatenation instead of per-byte bytearray appends
+    return (bytes((
+        0x00, 0x00, 0xFF,     # Preamble
+        length,
+        (-length) & 0xFF,     # Length checksum
+        0xD4,                 # TFI (host to PN532)
+        command_code,
+    )) + bytes(params) + bytes((dcs, 0x00)))  # DCS + postamble
+
+def send_frame(ser, frame, idle_timeout=None):
+    """Send prebuilt PN532 frame and return response"""
     ser.write(frame)
     ser.flush()
 
-    return read_response(ser)
-
-def read_response(ser, timeout=2.0):
-    """Read PN532 response frame"""
-    deadline = time.time() + timeout
+    # Byte 6 is the command code (after preamble, LEN, LCS and TFI)
+    return read_response(ser, frame[6] + 1, idle_timeout=idle_timeout)
 
-    # Wait for preamble
-    while time.time() < deadline:
-        byte = ser.read(1)
-        if byte == b'\x00':
-            if ser.read(2) == b'\x00\xFF':
-                break
-    else:
-        return None
-
-    # Read length
-    length = ser.read(1)
-    if not length:
-        return None
-    length = length[0]
-
-    lcs = ser.read(1)
-    if not lcs:
-        return None
-
-    # Verify length checksum
-    if ((length + lcs[0]) & 0xFF) != 0:
-        return None
+def send_command(ser, command_code, params=b''):
+    """Send PN532 command and return response"""
+    return send_frame(ser, build_frame(command_code, params))
 
-    # Read data
-    data = ser.read(length + 1)  # +1 for DCS
-    if len(data) != length + 1:
-        return None
+START_CODE = b'\x00\xFF'
+FRAME_HEADER_LEN = 5  # 00 00 FF LEN LCS
 
-    # Return payload (skip TFI and DCS)
-    return data[1:-1]
+def set_serial_baud_rate(ser, baudrate):
+    """Switch PN532 and host UART to a new baudrate (SetSerialBaudRate)"""
+    if send_command(ser, 0x10, bytes([BAUDRATE_CODES[baudrate]])) is None:
+        return False
 
-def tg_init_as_target(ser, ndef_data):
+    # PN532 changes rate only after the host ACKs the response (at the old rate)
+    ser.write(ACK_FRAME)
+    ser.flush()
+    time.sleep(BAUD_SWITCH_DELAY)
+    ser.baudrate = baudrate
+    return True
+
+# Long-lived readiness selector on the (non-blocking) port fd, set up at open
+rx_selector = selectors.DefaultSelector()
+
+def wait_readable(ser, timeout):
+    """Wait up to timeout seconds for incoming bytes without a blocking read"""
+    if ser.in_waiting:
+        return True
+    return bool(rx_selector.select(timeout))
+
+def read_exact(fd, n, deadline):
+    """Read exactly n bytes straight from the port fd; None on timeout/EOF"""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    now, select_ready, readv = time.monotonic, rx_selector.select, os.readv
+    got = 0
+    while got < n:
+        remaining = deadline - now()
+        if remaining <= 0 or not select_ready(remaining):
+            return None
+        try:
+            count = readv(fd, [view[got:]])
+        except BlockingIOError:
+            continue  # Spurious wakeup
+        if not count:
+            return None  # Port closed / device unplugged
+        got += count
+    return bytes(buf)
+
+def read_frame_header(fd, deadline):
+    """Read frame header; returns (length, lcs, bytes read past LCS) or None"""
+    # Normally one read returns exactly 00 00 FF LEN LCS
+    buf = read_exact(fd, FRAME_HEADER_LEN, deadline)
+    while buf is not None:
+        start = buf.find(START_CODE)
+        if start >= 0 and len(buf) >= start + 4:
+            return buf[start + 2], buf[start + 3], buf[start + 4:]
+        more = read_exact(fd, 1, deadline)  # Resync after noise
+        if more is None:
+            return None
+        buf += more
+    return None
+
+def read_response(ser, response_code, timeout=2.0, idle_timeout=None):
     """
-    Initialize PN532 as target (card emulation)
-    Command: 0x8C
+    Read PN532 response frame for the command answered by response_code
+    With idle_timeout set, give up as soon as the line stays silent that long
+    instead of blocking in read() for the full serial timeout
     """
-    params = bytearray()
+    deadline = time.monotonic() + timeout
+    fd = ser.fileno()
 
+    while True:
+        if idle_timeout is not None and not wait_readable(ser, idle_timeout):
+            return None
+
+        header = read_frame_header(fd, deadline)
+        if header is None:
+            return None
+        length, lcs, data = header
+
+        # ACK frame (00 00 FF 00 FF 00) precedes every response - skip it
+        if length == 0x00 and lcs == 0xFF:
+            if not data:
+                read_exact(fd, 1, deadline)  # Postamble
+            continue
+
+        # Verify length checksum
+        if ((length + lcs) & 0xFF) != 0:
+            return None
+
+        # Read data + DCS + postamble in one go
+        rest = read_exact(fd, length + 2 - len(data), deadline)
+        if rest is None:
+            return None
+        data += rest
+
+        # Late reply to an earlier command (e.g. an abandoned TgGetData) - drop it
+        if length < 2 or data[1] != response_code:
+            continue
+
+        # Return payload (skip TFI, response code and DCS)
+        return data[2:length]
+
+# TgInitAsTarget parameters (fixed, so the frame is built once at import)
+TG_INIT_AS_TARGET_PARAMS = bytes([
     # Mode: PICC only (0x04) + Passive (0x01) = 0x05
-    params.append(0x05)
+    0x05,
 
     # SENS_RES (2 bytes) - Mifare/ISO14443-4
-    params.extend([0x04, 0x00])
+    0x04, 0x00,
 
     # NFCID1t (3 bytes) - will be generated
-    params.extend([0x12, 0x34, 0x56])
+    0x12, 0x34, 0x56,
 
     # SEL_RES (1 byte) - ISO14443-4 compliant
-    params.append(0x40)
+    0x40,
 
     # FeliCa params (18 bytes) - required but not used
-    params.extend([
-        0x01, 0xFE, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7,
-        0xC0, 0xC1, 0xC2, 0xC3, 0xC4, 0xC5, 0xC6, 0xC7,
-        0xFF, 0xFF
-    ])
+    0x01, 0xFE, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7,
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC4, 0xC5, 0xC6, 0xC7,
+    0xFF, 0xFF,
 
     # NFCID3t (10 bytes)
-    params.extend([0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0A])
+    0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0A,
 
     # General bytes length (0 for now)
-    params.append(0x00)
+    0x00,
 
     # Historical bytes length (0 for now)
-    params.append(0x00)
+    0x00,
+])
 
-    return send_command(ser, 0x8C, params)
+# Precomputed frames for fixed commands
+GET_FIRMWARE_VERSION_FRAME = build_frame(0x02)
+SAM_CONFIGURATION_FRAME = build_frame(0x14, bytes([0x01, 0x14, 0x01]))
+TG_INIT_AS_TARGET_FRAME = build_frame(0x8C, TG_INIT_AS_TARGET_PARAMS)
+TG_GET_DATA_FRAME = build_frame(0x86)
+
+def tg_init_as_target(ser):
+    """
+    Initialize PN532 as target (card emulation)
+    Command: 0x8C
+    """
+    return send_frame(ser, TG_INIT_AS_TARGET_FRAME)
 
 def tg_get_data(ser):
-    """Get data from initiator (phone)"""
-    return send_command(ser, 0x86, [])
+    """Get data from initiator (phone); None once it goes quiet (disconnected)"""
+    return send_frame(ser, TG_GET_DATA_FRAME, idle_timeout=DISCONNECT_TIMEOUT_MS / 1000)
+
+# Complete TgSetData frames by response. Handlers hand back the same few
+# cached bytes objects (status words, READ BINARY chunks), whose hash CPython
+# caches too, so after the first session a response is framed by one lookup
+tg_set_data_frames = {}
 
 def tg_set_data(ser, data):
     """Send data to initiator (phone)"""
-    return send_command(ser, 0x8E, list(data))
-
-def create_ndef_text(text):
-    """Create NDEF Text Record"""
-    text_bytes = text.encode('utf-8')
-
-    record = bytearray()
-    record.append(0xD1)  # Header
-    record.append(0x01)  # Type length
-    record.append(len(text_bytes) + 3)  # Payload length
-    record.append(0x54)  # Type: T
-    record.append(0x02)  # Language length
-    record.extend(b'en')
-    record.extend(text_bytes)
+    frame = tg_set_data_frames.get(data)
+    if frame is None:
+        frame = tg_set_data_frames[data] = build_frame(0x8E, data)
+    return send_frame(ser, frame)
+
+def create_ndef_text(text_bytes):
+    """Create NDEF Text Record from UTF-8 encoded text"""
+    return bytes((
+        0xD1,                   # Header
+        0x01,                   # Type length
+        len(text_bytes) + 3,    # Payload length
+        0x54,                   # Type: T
+        0x02,                   # Language length
+    )) + b'en' + text_bytes
+
+# Readable files by ID; the NDEF file (NLEN + message) is added at startup
+FILES = {CC_FILE_ID: CC_FILE}
+selected_file = None
+
+# READ BINARY responses by (file, offset, Le); phones re-read the same ranges
+read_cache = {}
+
+# SELECT targets: AID / file ID -> handler, one dict lookup per SELECT
+def select_app():
+    global selected_file
+    selected_file = None
+    return SW_OK
+
+def select_cc():
+    global selected_file
+    selected_file = CC_FILE_ID
+    return SW_OK
+
+def select_ndef():
+    global selected_file
+    selected_file = NDEF_FILE_ID
+    return SW_OK
+
+AID_TABLE = {
+    NDEF_TAG_APP_AID: select_app,
+    CC_FILE_ID: select_cc,
+    NDEF_FILE_ID: select_ndef,
+}
 
-    return bytes(record)
+def select_unknown():
+    return SW_FILE_NOT_FOUND
+
+# APDU handlers, dispatched by INS byte
+def handle_select(cmd):
+    # CLA INS P1 P2 Lc Data...
+    aid = cmd[5:5 + cmd[4]] if len(cmd) > 5 else b''
+    if VERBOSE:
+        print(f"      → SELECT {aid.hex()}")
+    return AID_TABLE.get(aid, select_unknown)()
+
+def handle_read_binary(cmd):
+    # CLA INS P1-P2 (offset) Le
+    offset = (cmd[2] << 8) | cmd[3] if len(cmd) > 3 else 0
+    le = (cmd[4] or 256) if len(cmd) > 4 else 256
+    if VERBOSE:
+        print(f"      → READ BINARY {offset}+{le}")
+    key = (selected_file, offset, le)
+    resp = read_cache.get(key)
+    if resp is None:
+        data = FILES.get(selected_file)
+        if data is None:
+            return SW_FILE_NOT_FOUND  # No file selected
+        resp = read_cache[key] = data[offset:offset + le] + SW_OK
+    return resp
+
+def handle_unknown(cmd):
+    if VERBOSE:
+        print(f"      → Unknown (0x{cmd[1]:02X})")
+    return SW_NOT_SUPPORTED
+
+# 256-entry jump table indexed by INS: one list lookup per APDU, no if/elif chain
+APDU_HANDLERS = [handle_unknown] * 256
+APDU_HANDLERS[0xA4] = handle_select
+APDU_HANDLERS[0xB0] = handle_read_binary
 
 print("🔧 PN532 Card Emulation (Raw Commands)")
 print("="*60)
@@ -154,13 +313,18 @@ try:
                        rtscts=False, dsrdtr=False, xonxoff=False)
     ser.dtr = False
     ser.rts = False
-    time.sleep(0.2)
+    time.sleep(POST_RESET_DELAY)
+    ser.reset_input_buffer()  # Drop line noise once; not per command
+
+    # Frame reads bypass pyserial: select + readv on the raw fd
+    os.set_blocking(ser.fileno(), False)
+    rx_selector.register(ser.fileno(), selectors.EVENT_READ)
 
     print("✅ Serial port opened\n")
 
     # Get firmware (using raw command)
     print("Testing PN532 connection...")
-    response = send_command(ser, 0x02, [])  # GetFirmwareVersion
+    response = send_frame(ser, GET_FIRMWARE_VERSION_FRAME)  # GetFirmwareVersion
     if response and len(response) >= 4:
         print(f"✅ PN532 v{response[1]}.{response[2]}\n")
     else:
@@ -169,20 +333,44 @@ try:
         exit(1)
 
     # SAM configuration
-    send_command(ser, 0x14, [0x01, 0x14, 0x01])
+    send_frame(ser, SAM_CONFIGURATION_FRAME)
     print("✅ SAM configured\n")
 
+    # Raise UART speed for the APDU session (~8x less wire time per frame)
+    if HIGH_BAUDRATE:
+        if not set_serial_baud_rate(ser, HIGH_BAUDRATE) or not send_frame(ser, GET_FIRMWARE_VERSION_FRAME):
+            print(f"❌ PN532 not responding at {HIGH_BAUDRATE} baud")
+            print("   Set HIGH_BAUDRATE = None to stay at 115200")
+            ser.close()
+            exit(1)
+        print(f"✅ UART switched to {HIGH_BAUDRATE} baud\n")
+
     # Prepare payment
-    payment_json = json.dumps(payment, separators=(',', ':'))
+    payment_bytes = json.dumps(payment, separators=(',', ':')).encode('utf-8')
     print("Payment Request:")
     print("-" * 60)
     print(json.dumps(payment, indent=2))
     print("-" * 60)
-    print(f"Size: {len(payment_json)} bytes\n")
+    print(f"Size: {len(payment_bytes)} bytes\n")
 
-    ndef_msg = create_ndef_text(payment_json)
+    ndef_msg = create_ndef_text(payment_bytes)
     print(f"NDEF: {len(ndef_msg)} bytes\n")
 
+    # Type 4 NDEF file: 2-byte NLEN, then the message
+    ndef_file = FILES[NDEF_FILE_ID] = struct.pack('>H', len(ndef_msg)) + ndef_msg
+
+    # The payload is fixed for the run, so precompute the reads a phone walks:
+    # the CC, NLEN, then the message in MLe-sized chunks
+    max_le = struct.unpack_from('>H', CC_FILE, 3)[0]
+    read_cache[(CC_FILE_ID, 0, len(CC_FILE))] = CC_FILE + SW_OK
+    read_cache[(NDEF_FILE_ID, 0, 2)] = ndef_file[:2] + SW_OK
+    for offset in range(2, len(ndef_file), max_le):
+        read_cache[(NDEF_FILE_ID, offset, max_le)] = ndef_file[offset:offset + max_le] + SW_OK
+
+    # ...and their TgSetData frames
+    for resp in (SW_OK, SW_FILE_NOT_FOUND, *read_cache.values()):
+        tg_set_data_frames[resp] = build_frame(0x8E, resp)
+
     print("="*60)
     print("📱 TAP YOUR PHONE NOW!")
     print("="*60)
@@ -190,13 +378,17 @@ try:
     print("Waiting for tap...\n")
 
     tap_count = 0
+    last_listen_log = 0.0
 
     while True:
         try:
             # Initialize as target (blocks until phone taps)
-            print(f"[{time.strftime('%H:%M:%S')}] Listening...")
+            now = time.monotonic()
+            if now - last_listen_log >= LISTEN_LOG_INTERVAL:
+                last_listen_log = now
+                print(f"[{time.strftime('%H:%M:%S')}] Listening...")
 
-            response = tg_init_as_target(ser, ndef_msg)
+            response = tg_init_as_target(ser)
 
             if response:
                 tap_count += 1
@@ -210,54 +402,45 @@ try:
 
                 # Handle ISO-DEP session
                 session_active = True
+                selected_file = None
                 cmd_count = 0
 
                 while session_active:
                     # Get command from phone
                     cmd = tg_get_data(ser)
 
-                    if cmd and len(cmd) > 0:
+                    if cmd and cmd[0] == 0x00:
                         cmd_count += 1
 
-                        # Skip status byte if present
-                        if cmd[0] == 0x00:
-                            cmd = cmd[1:]
-
-                        if len(cmd) >= 2:
-                            print(f"   📥 Cmd #{cmd_count}: {cmd.hex()}")
-
-                            # Parse APDU
-                            cla = cmd[0]
-                            ins = cmd[1]
-
-                            resp = None
-
-                            # SELECT (0xA4)
-                            if ins == 0xA4:
-                                print(f"      → SELECT")
-                                resp = bytes([0x90, 0x00])  # OK
+                        # TgGetData: status byte, then the APDU
+                        apdu = cmd[1:]
 
-                            # READ BINARY (0xB0)
-                            elif ins == 0xB0:
-                                print(f"      → READ BINARY")
-                                # Send chunk of NDEF
-                                resp = ndef_msg[:50] + bytes([0x90, 0x00])
+                        if len(apdu) >= 2:
+                            if VERBOSE:
+                                print(f"   📥 Cmd #{cmd_count}: {apdu.hex()}")
 
-                            else:
-                                print(f"      → Unknown (0x{ins:02X})")
-                                resp = bytes([0x6A, 0x82])  # Not supported
+                            # Dispatch on INS
+                            resp = APDU_HANDLERS[apdu[1]](apdu)
 
                             # Send response
                             if resp:
                                 result = tg_set_data(ser, resp)
-                                if result:
-                                    print(f"      ← Sent: {resp[:20].hex()}... ({len(resp)} bytes)\n")
-                                else:
+                                if not result:
                                     print(f"      ⚠️  Send failed\n")
                                     session_active = False
+                                elif VERBOSE:
+                                    print(f"      ← Sent: {resp[:20].hex()}... ({len(resp)} bytes)\n")
+
+                    elif cmd:
+                        # Non-zero status: phone released the target or the link failed
+                        print(f"   📱 Session ended (status 0x{cmd[0]:02X})\n")
+                        session_active = False
 
                     else:
-                        # No command = phone disconnected
+                        # No command = phone disconnected. Abort the TgGetData
+                        # the PN532 may still be running, so its late reply
+                        # can't be taken for the next TgInitAsTarget response
+                        ser.write(ACK_FRAME)
                         print("   📱 Phone disconnected\n")
                         session_active = False
 
@@ -274,8 +457,6 @@ try:
             if "timeout" not in str(e).lower():
                 print(f"   ⚠️  {e}")
 
-        time.sleep(0.1)
-
 except KeyboardInterrupt:
     print(f"\n\n📊 Summary: {tap_count} phone taps detected")
     print("✅ Test complete")
@@ -6,10 +6,57 @@ This is the FastPay production approach!
 import serial
 import json
 import time
+import struct
 from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+POST_RESET_DELAY = 0.05  # DTR/RTS settle time after opening the port
+SERIAL_TIMEOUT = 0.1
+HIGH_BAUDRATE = 921600  # Switched to after init (None = stay at BAUDRATE)
+BAUD_SWITCH_DELAY = 0.01  # Let the PN532 retune its UART after the switch
+
+# SetSerialBaudRate (0x10) codes, PN532 User Manual 7.2.8
+BAUDRATE_CODES = {230400: 0x05, 460800: 0x06, 921600: 0x07, 1288000: 0x08}
+
+ACK_FRAME = b'\x00\x00\xFF\x00\xFF\x00'
+
+# APDU status words
+SW_OK = b'\x90\x00'  # Success
+SW_NOT_SUPPORTED = b'\x6A\x82'  # Not supported
+
+# TgInitAsTarget parameters (fixed, so built once at import)
+
+# Mode:
+# 0x04 = PICC only (act as card)
+# 0x01 = Passive only
+TARGET_MODE = 0x05  # 0x04 | 0x01
+
+# Mifare parameters (Type 4 Tag - like credit cards)
+MIFARE_PARAMS = bytes([
+    0x08, 0x00,  # SENS_RES (Type 4 Tag)
+    0x12, 0x34, 0x56,  # NFCID1t (will be randomized by PN532)
+    0x40  # SEL_RES (ISO14443-4 compliant)
+])
+
+# FeliCa parameters (Japanese standard - required but we don't use it)
+FELICA_PARAMS = bytes([
+    0x01, 0xFE,
+    0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7,  # IDm
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC4, 0xC5, 0xC6, 0xC7,  # PMm
+    0xFF, 0xFF  # System Code
+])
+
+# NFCID3t (for Type F)
+NFCID3T = bytes([0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0A])
+
+# Full parameter block; empty general and historical bytes (length 0 each)
+TG_INIT_AS_TARGET_PARAMS = bytes([TARGET_MODE]) + MIFARE_PARAMS + FELICA_PARAMS + NFCID3T + b'\x00\x00'
+
+# Target-mode commands (adafruit_pn532 has no wrappers for these)
+TG_INIT_AS_TARGET = 0x8C
+TG_GET_DATA = 0x86
+TG_SET_DATA = 0x8E
 
 # Payment request to send
 payment = {
@@ -21,31 +68,94 @@ payment = {
     "timestamp": int(time.time())
 }
 
+# NDEF Text Record header: flags, type length, payload length, type, language length + code
+NDEF_TEXT_HEADER = struct.Struct('>BBBBB2s')
+
 def create_ndef_text_message(text):
     """Create NDEF Text Record"""
     text_bytes = text.encode('utf-8')
 
-    # NDEF Text Record
-    record = bytearray()
-    record.append(0xD1)  # Header: MB=1, ME=1, SR=1, TNF=Well-known
-    record.append(0x01)  # Type length
-    record.append(len(text_bytes) + 3)  # Payload length (includes language)
-    record.append(0x54)  # Type: 'T' (Text)
-    record.append(0x02)  # Language length
-    record.extend(b'en')  # Language code
-    record.extend(text_bytes)
-
-    return bytes(record)
+    return NDEF_TEXT_HEADER.pack(
+        0xD1,  # Header: MB=1, ME=1, SR=1, TNF=Well-known
+        0x01,  # Type length
+        len(text_bytes) + 3,  # Payload length (includes language)
+        0x54,  # Type: 'T' (Text)
+        0x02,  # Language length
+        b'en',  # Language code
+    ) + text_bytes
+
+def set_serial_baud_rate(pn532, uart, baudrate):
+    """Switch PN532 and host UART to a new baudrate (SetSerialBaudRate)"""
+    if pn532.call_function(0x10, params=[BAUDRATE_CODES[baudrate]]) is None:
+        raise RuntimeError(f"SetSerialBaudRate to {baudrate} not acknowledged")
+
+    # PN532 changes rate only after the host ACKs the response (at the old rate)
+    uart.write(ACK_FRAME)
+    uart.flush()
+    time.sleep(BAUD_SWITCH_DELAY)
+    uart.baudrate = baudrate
+
+    _ = pn532.firmware_version  # Raises if PN532 is not reachable at new rate
+
+def tg_init_as_target(pn532, timeout):
+    """TgInitAsTarget: wait for an initiator; returns its activation data, or None on timeout"""
+    return pn532.call_function(TG_INIT_AS_TARGET, params=TG_INIT_AS_TARGET_PARAMS,
+                               response_length=64, timeout=timeout)
+
+def tg_get_data(pn532, timeout):
+    """TgGetData: returns the initiator's command, or None on timeout/error status"""
+    response = pn532.call_function(TG_GET_DATA, response_length=64, timeout=timeout)
+    if not response or response[0] != 0x00:
+        return None
+    return response[1:]
+
+def tg_set_data(pn532, data):
+    """TgSetData: send a response to the initiator; True if the PN532 reports success"""
+    response = pn532.call_function(TG_SET_DATA, params=data, response_length=1)
+    return bool(response) and response[0] == 0x00
+
+# APDU handlers, dispatched by INS byte
+# SELECT (0xA4)
+def handle_select(command):
+    print(f"      → SELECT command")
+    return SW_OK
+
+# READ BINARY responses by (offset, Le); phones re-read the same windows
+read_cache = {}
+
+# Windows built at startup: NLEN ahead of every step, at the usual Le sizes
+PRECOMPUTED_READ_STEP = 32
+PRECOMPUTED_READ_LENGTHS = (2, 16, 32, 64, 128, 240, 256)
+
+# READ BINARY (0xB0)
+def handle_read_binary(command):
+    # CLA INS P1-P2 (offset) Le
+    offset = (command[2] << 8) | command[3] if len(command) > 3 else 0
+    le = (command[4] or 256) if len(command) > 4 else 256
+    print(f"      → READ BINARY command ({offset}+{le})")
+    response = read_cache.get((offset, le))
+    if response is None:
+        response = read_cache[(offset, le)] = ndef_file[offset:offset + le] + SW_OK
+    return response
+
+def handle_unknown(command):
+    print(f"      → Unknown (CLA=0x{command[0]:02X}, INS=0x{command[1]:02X})")
+    return SW_NOT_SUPPORTED
+
+APDU_HANDLERS = {
+    0xA4: handle_select,
+    0xB0: handle_read_binary,
+}
 
 print("🔧 PN532 Card Emulation - Phone Can Read Payment!")
 print("="*60)
 
 try:
     # Setup
-    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=1)
+    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=SERIAL_TIMEOUT)
     uart.dtr = False
     uart.rts = False
-    time.sleep(0.2)
+    time.sleep(POST_RESET_DELAY)
 
     pn532 = PN532_UART(uart, debug=False)
     ic, ver, rev, support = pn532.firmware_version
@@ -53,6 +163,11 @@ try:
 
     pn532.SAM_configuration()
 
+    # Raise UART speed for the APDU session (~8x less wire time per frame)
+    if HIGH_BAUDRATE:
+        set_serial_baud_rate(pn532, uart, HIGH_BAUDRATE)
+        print(f"✅ UART switched to {HIGH_BAUDRATE} baud\n")
+
     # Prepare payment
     payment_json = json.dumps(payment, indent=2)
     compact_json = json.dumps(payment, separators=(',', ':'))
@@ -68,6 +183,14 @@ try:
     print(f"NDEF message: {len(ndef_message)} bytes")
     print(f"Preview: {ndef_message[:40].hex()}...\n")
 
+    # Type 4 NDEF file: 2-byte NLEN, then the message
+    ndef_file = struct.pack('>H', len(ndef_message)) + ndef_message
+
+    # The payload is fixed for the run - precompute the likely READ BINARY windows
+    for offset in {2, *range(0, len(ndef_file), PRECOMPUTED_READ_STEP)}:
+        for le in PRECOMPUTED_READ_LENGTHS:
+            read_cache[(offset, le)] = ndef_file[offset:offset + le] + SW_OK
+
     print("="*60)
     print("📱 TAP YOUR PHONE ON THE MODULE NOW!")
     print("="*60)
@@ -83,37 +206,8 @@ try:
             # Initialize as target (card emulation)
             # This makes the PN532 act like an NFC tag
 
-            # Mode:
-            # 0x04 = PICC only (act as card)
-            # 0x01 = Passive only
-            mode = 0x05  # 0x04 | 0x01
-
-            # Mifare parameters (Type 4 Tag - like credit cards)
-            mifare_params = bytes([
-                0x08, 0x00,  # SENS_RES (Type 4 Tag)
-                0x12, 0x34, 0x56,  # NFCID1t (will be randomized by PN532)
-                0x40  # SEL_RES (ISO14443-4 compliant)
-            ])
-
-            # FeliCa parameters (Japanese standard - required but we don't use it)
-            felica_params = bytes([
-                0x01, 0xFE,
-                0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7,  # IDm
-                0xC0, 0xC1, 0xC2, 0xC3, 0xC4, 0xC5, 0xC6, 0xC7,  # PMm
-                0xFF, 0xFF  # System Code
-            ])
-
-            # NFCID3t (for Type F)
-            nfcid3t = bytes([0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0A])
-
             # Wait for phone to initiate (blocks until phone taps or timeout)
-            response = pn532.TgInitAsTarget(
-                mode=mode,
-                mifare_params=mifare_params,
-                felica_params=felica_params,
-                nfcid3t=nfcid3t,
-                timeout=1  # 1 second timeout, then retry
-            )
+            response = tg_init_as_target(pn532, timeout=1)  # 1 second timeout, then retry
 
             if response:
                 tap_count += 1
@@ -135,7 +229,7 @@ try:
                 while session_active:
                     try:
                         # Receive command from phone
-                        received = pn532.TgGetData(timeout=2)
+                        received = tg_get_data(pn532, timeout=2)
 
                         if received:
                             command_count += 1
@@ -150,34 +244,17 @@ try:
                             # 00 B0 ... = READ BINARY
 
                             if len(received) >= 2:
-                                cla = received[0]  # Class byte
-                                ins = received[1]  # Instruction byte
-
-                                response_data = None
-
-                                # SELECT command (0xA4)
-                                if ins == 0xA4:
-                                    print(f"      → SELECT command")
-                                    # Response: Success (0x90 0x00)
-                                    response_data = bytes([0x90, 0x00])
-
-                                # READ BINARY command (0xB0)
-                                elif ins == 0xB0:
-                                    print(f"      → READ BINARY command")
-                                    # Send NDEF message (simplified)
-                                    # In real implementation, need to handle offsets/lengths
-                                    response_data = ndef_message[:20] + bytes([0x90, 0x00])
-
-                                # Unknown command
-                                else:
-                                    print(f"      → Unknown (CLA=0x{cla:02X}, INS=0x{ins:02X})")
-                                    # Response: Not supported
-                                    response_data = bytes([0x6A, 0x82])
+                                # Dispatch on the instruction byte
+                                handler = APDU_HANDLERS.get(received[1], handle_unknown)
+                                response_data = handler(received)
 
                                 # Send response
                                 if response_data:
-                                    pn532.TgSetData(response_data)
-                                    print(f"      ← Response: {response_data.hex()}\n")
+                                    if not tg_set_data(pn532, response_data):
+                                        print("      ⚠️  Send failed\n")
+                                        session_active = False
+                                    else:
+                                        print(f"      ← Response: {response_data.hex()}\n")
 
                         else:
                             # No command received - phone disconnected
@@ -211,8 +288,6 @@ try:
         except KeyboardInterrupt:
             raise
 
-        time.sleep(0.1)
-
 except KeyboardInterrupt:
     print("\n\n📊 Session Summary:")
     print(f"   Total phone taps: {tap_count}")
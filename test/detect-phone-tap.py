@@ -9,6 +9,36 @@ from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+HIGH_BAUDRATE = 921600  # Switched to after init (None = stay at BAUDRATE)
+BAUD_SWITCH_DELAY = 0.01  # Let the PN532 retune its UART after the switch
+
+# SetSerialBaudRate (0x10) codes, PN532 User Manual 7.2.8
+BAUDRATE_CODES = {230400: 0x05, 460800: 0x06, 921600: 0x07, 1288000: 0x08}
+
+ACK_FRAME = b'\x00\x00\xFF\x00\xFF\x00'
+
+# Device type guess by UID length
+UID_TYPES = {
+    4: "Likely NFC tag or card",
+    7: "Likely phone or modern NFC tag",
+}
+
+def set_serial_baud_rate(pn532, uart, baudrate):
+    """Switch PN532 and host UART to a new baudrate; False if PN532 refuses"""
+    try:
+        if pn532.call_function(0x10, params=[BAUDRATE_CODES[baudrate]]) is None:
+            return False
+    except RuntimeError:
+        return False  # Still at the old rate, nothing changed
+
+    # PN532 changes rate only after the host ACKs the response (at the old rate)
+    uart.write(ACK_FRAME)
+    uart.flush()
+    time.sleep(BAUD_SWITCH_DELAY)
+    uart.baudrate = baudrate
+
+    _ = pn532.firmware_version  # Raises if PN532 is not reachable at new rate
+    return True
 
 print("🔧 Phone Tap Detection Test")
 print("="*60)
@@ -29,6 +59,13 @@ try:
     # Configure SAM
     pn532.SAM_configuration()
 
+    # Raise UART speed for the polling loop (~8x less wire time per frame)
+    if HIGH_BAUDRATE:
+        if set_serial_baud_rate(pn532, uart, HIGH_BAUDRATE):
+            print(f"✅ UART switched to {HIGH_BAUDRATE} baud\n")
+        else:
+            print(f"⚠️  Baud switch refused, staying at {BAUDRATE}\n")
+
     print("="*60)
     print("📱 TAP YOUR PHONE ON THE NFC MODULE")
     print("="*60)
@@ -43,28 +80,22 @@ try:
         uid = pn532.read_passive_target(timeout=0.5)
 
         if uid:
-            # Convert to hex string for comparison
-            uid_hex = uid.hex().upper()
-
             # Only announce if it's a new device (avoid spam from continuous read)
-            if uid_hex != last_uid:
+            # Compare raw bytes; format hex only when there is something to print
+            if uid != last_uid:
+                uid_hex = uid.hex().upper()
                 tap_count += 1
                 print(f"\n🎉 TAP #{tap_count} DETECTED!")
                 print(f"   Time: {time.strftime('%H:%M:%S')}")
                 print(f"   Device UID: {uid_hex}")
                 print(f"   UID Length: {len(uid)} bytes")
-
-                if len(uid) == 4:
-                    print(f"   Type: Likely NFC tag or card")
-                elif len(uid) == 7:
-                    print(f"   Type: Likely phone or modern NFC tag")
-                else:
-                    print(f"   Type: Unknown ({len(uid)} byte UID)")
+                uid_type = UID_TYPES.get(len(uid)) or f"Unknown ({len(uid)} byte UID)"
+                print(f"   Type: {uid_type}")
 
                 print(f"\n   ✅ Your phone/tag CAN communicate with the module!")
                 print(f"   Waiting for next tap...\n")
 
-                last_uid = uid_hex
+                last_uid = uid
 
                 # Keep reading same device for a moment
                 time.sleep(0.5)
@@ -75,8 +106,6 @@ try:
                 last_uid = None
                 # print("   Device removed\n")
 
-        time.sleep(0.1)
-
 except KeyboardInterrupt:
     print("\n\n📊 Session Summary:")
     print(f"   Total taps detected: {tap_count}")
@@ -2,10 +2,24 @@
 """Test multiple baudrates to find the correct one"""
 import serial
 import time
+import select
+import re
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATES = [9600, 19200, 38400, 57600, 115200]
 
+RESPONSE_TIMEOUT = 0.3  # Max wait for a reply at each baudrate
+FRAME_SETTLE = 0.05  # After the first byte, let the rest of the frame arrive
+
+# GetFirmwareVersion
+COMMAND = bytes([
+    0x00, 0x00, 0xFF, 0x02, 0xFE,
+    0xD4, 0x02, 0x2A, 0x00
+])
+
+# Preamble + LEN/LCS + TFI + GetFirmwareVersion response code, in one C-level scan
+FIRMWARE_FRAME = re.compile(rb'\x00\x00\xFF[\x00-\xFF]{2}\xD5\x03', re.DOTALL)
+
 print("🔍 Testing different baudrates for PN532\n")
 
 for baud in BAUDRATES:
@@ -15,23 +29,22 @@ for baud in BAUDRATES:
         ser = serial.Serial(PORT, baud, timeout=1)
         time.sleep(0.1)
 
-        # Send GetFirmwareVersion
-        command = bytearray([
-            0x00, 0x00, 0xFF, 0x02, 0xFE,
-            0xD4, 0x02, 0x2A, 0x00
-        ])
+        ser.write(COMMAND)
 
-        ser.write(command)
-        time.sleep(0.3)
+        # Wake as soon as anything comes back instead of a fixed 0.3 s sleep
+        readable, _, _ = select.select([ser], [], [], RESPONSE_TIMEOUT)
+        if readable:
+            time.sleep(FRAME_SETTLE)
 
         if ser.in_waiting > 0:
             response = ser.read(ser.in_waiting)
             print(f"✅ RESPONSE! ({len(response)} bytes)")
             print(f"   Data: {response.hex(' ')}")
 
-            if b'\x00\x00\xFF' in response:
+            if FIRMWARE_FRAME.search(response):
                 print(f"\n🎉 FOUND IT! Module responds at {baud} baud")
                 print(f"   Use NFC_BAUD_RATE={baud} in your config\n")
+                ser.close()
                 break
         else:
             print("No response")
@@ -4,9 +4,30 @@ import serial
 import serial.tools.list_ports
 import subprocess
 import sys
+import time
+import threading
+from contextlib import closing
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 
+# GetFirmwareVersion
+GET_FW_FRAME = bytes([0x00, 0x00, 0xFF, 0x02, 0xFE, 0xD4, 0x02, 0x2A, 0x00])
+
+def stream_command(args, timeout=5):
+    """Yield a command's stdout lines as they arrive; stops the command early when closed"""
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, text=True, bufsize=1)
+    watchdog = threading.Timer(timeout, proc.kill)  # Same limit as run(timeout=...)
+    watchdog.start()
+    try:
+        for line in proc.stdout:
+            yield line.rstrip('\n')
+    finally:
+        watchdog.cancel()
+        if proc.poll() is None:
+            proc.terminate()  # Don't wait for the full enumeration
+        proc.wait()
+        proc.stdout.close()
+
 print("🔍 FT232 Driver and USB Configuration Check\n")
 print("="*60)
 
@@ -25,23 +46,20 @@ for port in serial.tools.list_ports.comports():
 # 2. Check macOS USB system info
 print("\n2. macOS USB System Info:")
 try:
-    result = subprocess.run(['system_profiler', 'SPUSBDataType'],
-                          capture_output=True, text=True, timeout=5)
-
-    # Find FT232 section
-    lines = result.stdout.split('\n')
+    # Find FT232 section, reading output as it streams in
     in_ft232_section = False
 
-    for line in lines:
-        if 'FT232R USB UART' in line or 'ABSCDY4Z' in line:
-            in_ft232_section = True
+    with closing(stream_command(['system_profiler', 'SPUSBDataType'])) as lines:
+        for line in lines:
+            if 'FT232R USB UART' in line or 'ABSCDY4Z' in line:
+                in_ft232_section = True
 
-        if in_ft232_section:
-            print(f"   {line}")
-            if 'Location ID' in line or 'Current Available' in line:
-                pass  # Keep printing
-            elif line.strip() and ':' not in line:
-                break  # End of section
+            if in_ft232_section:
+                print(f"   {line}")
+                if 'Location ID' in line or 'Current Available' in line:
+                    pass  # Keep printing
+                elif line.strip() and ':' not in line:
+                    break  # End of section
 
 except Exception as e:
     print(f"   ⚠️  Could not get USB info: {e}")
@@ -50,14 +68,17 @@ except Exception as e:
 print("\n3. FT232 Driver Check:")
 try:
     # Check for FTDI kext (kernel extension)
-    result = subprocess.run(['kextstat'], capture_output=True, text=True)
-
-    ftdi_drivers = [line for line in result.stdout.split('\n')
-                    if 'ftdi' in line.lower() or 'serial' in line.lower()]
+    ftdi_drivers = []
+    with closing(stream_command(['kextstat'])) as lines:
+        for line in lines:
+            if 'ftdi' in line.lower() or 'serial' in line.lower():
+                ftdi_drivers.append(line)
+                if len(ftdi_drivers) == 5:
+                    break  # Only the first 5 are shown
 
     if ftdi_drivers:
         print("   Found kernel extensions:")
-        for driver in ftdi_drivers[:5]:  # Show first 5
+        for driver in ftdi_drivers:  # Show first 5
             print(f"   {driver}")
     else:
         print("   ✅ Using built-in macOS driver (Apple's IOUSBFamily)")
@@ -92,10 +113,13 @@ try:
         ("DSR/DTR modem", False, False, True),
     ]
 
+    # Same handle throughout: pyserial re-applies termios on each attribute change
+    ser.timeout = 0.5
+
     for name, rtscts, xonxoff, dsrdtr in configs:
-        ser.close()
-        ser = serial.Serial(PORT, 115200, timeout=0.5,
-                           rtscts=rtscts, xonxoff=xonxoff, dsrdtr=dsrdtr)
+        ser.rtscts = rtscts
+        ser.xonxoff = xonxoff
+        ser.dsrdtr = dsrdtr
         ser.dtr = False
         ser.rts = False
 
@@ -103,11 +127,7 @@ try:
         print(f"      rtscts={rtscts}, xonxoff={xonxoff}, dsrdtr={dsrdtr}")
 
         # Send GetFirmwareVersion
-        import time
-        time.sleep(0.1)
-
-        cmd = bytearray([0x00, 0x00, 0xFF, 0x02, 0xFE, 0xD4, 0x02, 0x2A, 0x00])
-        ser.write(cmd)
+        ser.write(GET_FW_FRAME)
         time.sleep(0.3)
 
         if ser.in_waiting > 0:
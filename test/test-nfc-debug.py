@@ -1,10 +1,57 @@
 #!/usr/bin/env python3
 """Debug PN532 NFC module - comprehensive diagnostics"""
+import select
 import serial
 import time
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+READ_TIMEOUT = 0.5  # Per sized read; replies return as soon as they are in
+LATE_BYTES_WINDOW = 0.1  # Test 1 listens this long for bytes arriving after the flush
+
+ACK_LEN = 6  # 00 00 FF 00 FF 00
+FRAME_HEADER_LEN = 5  # 00 00 FF LEN LCS
+
+# Frame markers
+PREAMBLE = b'\x00\x00\xFF'
+
+def read_command_response(ser):
+    """Read ACK + response frame with sized reads; returns whatever arrived"""
+    response = ser.read(ACK_LEN)
+    if len(response) < ACK_LEN:
+        return response
+
+    header = ser.read(FRAME_HEADER_LEN)
+    response += header
+    if len(header) == FRAME_HEADER_LEN:
+        response += ser.read(header[3] + 2)  # Data + DCS + postamble
+    return response
+
+# Frames sent during the diagnostics (fixed, so built once at import)
+WAKEUP = bytes([0x55, 0x55, 0x00, 0x00, 0x00])
+
+SAM_CONFIG_FRAME = bytes([
+    0x00, 0x00, 0xFF,  # Preamble
+    0x05,              # Length (5 bytes: D4 14 01 14 01)
+    0xFB,              # Length checksum (0x100 - 0x05)
+    0xD4,              # Direction
+    0x14,              # SAMConfiguration command
+    0x01,              # Normal mode
+    0x14,              # Timeout (1 second)
+    0x01,              # Use IRQ
+    0xFE,              # Data checksum
+    0x00               # Postamble
+])
+
+GET_FW_FRAME = bytes([
+    0x00, 0x00, 0xFF,  # Preamble
+    0x02,              # Length
+    0xFE,              # Length checksum
+    0xD4,              # Direction
+    0x02,              # GetFirmwareVersion
+    0x2A,              # Data checksum
+    0x00               # Postamble
+])
 
 print("🔍 PN532 NFC Module Debug Tool")
 print("="*50)
@@ -13,7 +60,7 @@ print(f"Baudrate: {BAUDRATE}\n")
 
 try:
     # Open serial port
-    ser = serial.Serial(PORT, BAUDRATE, timeout=2)
+    ser = serial.Serial(PORT, BAUDRATE, timeout=READ_TIMEOUT)
     print("✅ Serial port opened")
     print(f"   DTR: {ser.dtr}, RTS: {ser.rts}\n")
     time.sleep(0.2)
@@ -21,17 +68,21 @@ try:
     # Test 1: Check if ANY data is received
     print("TEST 1: Checking for any existing data in buffer...")
     ser.reset_input_buffer()
-    time.sleep(0.1)
-    if ser.in_waiting > 0:
-        garbage = ser.read(ser.in_waiting)
+
+    # Give late bytes up to LATE_BYTES_WINDOW to show up (returns at the
+    # first byte), then drain until idle
+    garbage = b''
+    if select.select([ser], [], [], LATE_BYTES_WINDOW)[0]:
+        while ser.in_waiting:
+            garbage += ser.read(ser.in_waiting)
+    if garbage:
         print(f"   Found {len(garbage)} bytes: {garbage.hex(' ')}")
     else:
         print("   ✓ Buffer is clean\n")
 
     # Test 2: Send wake-up sequence (some PN532 modules need this)
     print("TEST 2: Sending PN532 wake-up sequence...")
-    wakeup = bytearray([0x55, 0x55, 0x00, 0x00, 0x00])
-    ser.write(wakeup)
+    ser.write(WAKEUP)
     time.sleep(0.5)
 
     if ser.in_waiting > 0:
@@ -42,26 +93,12 @@ try:
 
     # Test 3: SAM Configuration (required before other commands)
     print("TEST 3: Sending SAM Configuration...")
-    sam_config = bytearray([
-        0x00, 0x00, 0xFF,  # Preamble
-        0x05,              # Length (5 bytes: D4 14 01 14 01)
-        0xFB,              # Length checksum (0x100 - 0x05)
-        0xD4,              # Direction
-        0x14,              # SAMConfiguration command
-        0x01,              # Normal mode
-        0x14,              # Timeout (1 second)
-        0x01,              # Use IRQ
-        0xFE,              # Data checksum
-        0x00               # Postamble
-    ])
-
-    ser.write(sam_config)
-    time.sleep(0.5)
+    ser.write(SAM_CONFIG_FRAME)
+    response = read_command_response(ser)
 
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting)
+    if response:
         print(f"   ✅ SAM Config response: {response.hex(' ')}")
-        if b'\x00\x00\xFF' in response:
+        if response.find(PREAMBLE) >= 0:
             print("   ✅ Valid PN532 frame detected!\n")
         else:
             print("   ⚠️  Response format unexpected\n")
@@ -70,28 +107,17 @@ try:
 
     # Test 4: GetFirmwareVersion (the main test)
     print("TEST 4: Requesting firmware version...")
-    get_fw = bytearray([
-        0x00, 0x00, 0xFF,  # Preamble
-        0x02,              # Length
-        0xFE,              # Length checksum
-        0xD4,              # Direction
-        0x02,              # GetFirmwareVersion
-        0x2A,              # Data checksum
-        0x00               # Postamble
-    ])
-
-    ser.write(get_fw)
-    time.sleep(0.5)
+    ser.write(GET_FW_FRAME)
+    response = read_command_response(ser)
 
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting)
+    if response:
         print(f"   ✅ Firmware response: {response.hex(' ')}")
 
         # Try to parse
-        if b'\x00\x00\xFF' in response and len(response) >= 13:
+        # Find start of frame (after the ACK, which has the same preamble)
+        start = response.find(PREAMBLE, ACK_LEN)
+        if start >= 0 and len(response) >= 13:
             try:
-                # Find start of frame
-                start = response.index(b'\x00\x00\xFF')
                 ic = response[start + 7]
                 ver = response[start + 8]
                 rev = response[start + 9]
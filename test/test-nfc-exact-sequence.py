@@ -5,45 +5,63 @@ This got a response: DTR/RTS HIGH → send data → DTR/RTS LOW → send command
 """
 import serial
 import time
+import select
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
 
+# ACK (6) + GetFirmwareVersion response frame (13): stop reading once we have both
+FIRMWARE_RESPONSE_LEN = 6 + 13
+
+# Frames sent during the sequence (fixed, so built once at import)
+WAKEUP_DATA = b'\x55\xAA\xFF\x00'
+WAKEUP_STREAM = b'\xFF' * 100
+GET_FW_FRAME = bytes([
+    0x00, 0x00, 0xFF, 0x02, 0xFE,
+    0xD4, 0x02, 0x2A, 0x00
+])
+
 def read_ack(ser, timeout=1.0):
     """Read ACK frame"""
-    deadline = time.time() + timeout
-    buf = b''
-    while time.time() < deadline and len(buf) < 6:
-        chunk = ser.read(6 - len(buf))
+    read, now = ser.read, time.monotonic  # Locals: no attribute lookups per pass
+    deadline = now() + timeout
+    buf = bytearray()
+    while now() < deadline and len(buf) < 6:
+        chunk = read(6 - len(buf))
         if chunk:
-            buf += chunk
+            buf.extend(chunk)
     return buf == b'\x00\x00\xFF\x00\xFF\x00'
 
+# Frame markers
+PREAMBLE = b'\x00\x00\xFF'
+FW_MARKER = b'\xD5\x03'  # TFI + GetFirmwareVersion response code
+
 def read_frame(ser, timeout=1.0):
     """Read response frame"""
-    end = time.time() + timeout
-
-    # Find preamble
-    while time.time() < end:
-        byte1 = ser.read(1)
-        if byte1 == b'\x00':
-            byte2 = ser.read(1)
-            byte3 = ser.read(1)
-            if byte2 == b'\x00' and byte3 == b'\xFF':
-                break
-    else:
-        return None
-
-    length_bytes = ser.read(2)
-    if len(length_bytes) != 2:
+    read, now = ser.read, time.monotonic  # Locals: no attribute lookups per pass
+    end = now() + timeout
+
+    # Find preamble + LEN + LCS, reading whatever is buffered (at least 1 byte)
+    buf = bytearray()
+    while True:
+        idx = buf.find(PREAMBLE)
+        if idx >= 0 and len(buf) >= idx + 5:
+            break
+        if now() >= end:
+            return None
+        buf += read(max(1, ser.in_waiting))
+
+    length = buf[idx + 3]
+
+    # TFI + data + DCS in one read, minus what already arrived
+    data = buf[idx + 5:]
+    missing = length + 1 - len(data)
+    if missing > 0:
+        data += read(missing)
+    if len(data) < length + 1:
         return None
 
-    length = length_bytes[0]
-    data = ser.read(length + 1)
-    if len(data) != length + 1:
-        return None
-
-    return data[1:-1]  # Strip TFI and DCS
+    return bytes(data[1:length])  # Strip TFI and DCS
 
 print("🔧 Testing EXACT sequence that worked before")
 print("="*60)
@@ -63,7 +81,7 @@ try:
 
     # STEP 2: Send random wake-up data
     print("\nStep 2: Sending wake-up data...")
-    ser.write(b'\x55\xAA\xFF\x00')
+    ser.write(WAKEUP_DATA)
     time.sleep(0.2)
 
     # Clear any response
@@ -73,7 +91,7 @@ try:
 
     # STEP 3: Send continuous stream (this was in the working test)
     print("\nStep 3: Sending continuous data stream...")
-    ser.write(b'\xFF' * 100)
+    ser.write(WAKEUP_STREAM)
     time.sleep(0.3)
 
     # Clear response
@@ -90,38 +108,37 @@ try:
 
     # STEP 5: Send GetFirmwareVersion command
     print("\nStep 5: Sending GetFirmwareVersion command...")
-    command = bytearray([
-        0x00, 0x00, 0xFF, 0x02, 0xFE,
-        0xD4, 0x02, 0x2A, 0x00
-    ])
-    ser.write(command)
-    print(f"   Sent: {command.hex(' ')}")
-    time.sleep(0.5)  # Give it extra time
-
-    # Read everything available
-    print("\nStep 6: Reading response...")
-    all_data = b''
-    deadline = time.time() + 1.0
+    ser.write(GET_FW_FRAME)
+    print(f"   Sent: {GET_FW_FRAME.hex(' ')}")
 
-    while time.time() < deadline:
-        if ser.in_waiting > 0:
-            chunk = ser.read(ser.in_waiting)
-            all_data += chunk
-            print(f"   Read {len(chunk)} bytes: {chunk.hex(' ')}")
-        else:
-            time.sleep(0.05)
+    # Read everything available, as soon as it arrives
+    print("\nStep 6: Reading response...")
+    all_data = bytearray()  # Grows in place; bytes += would copy on every chunk
+    deadline = time.monotonic() + 1.5
+
+    while len(all_data) < FIRMWARE_RESPONSE_LEN:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        readable, _, _ = select.select([ser], [], [], remaining)
+        if not readable:
+            break
+        chunk = ser.read(ser.in_waiting or 1)
+        all_data.extend(chunk)
+        print(f"   Read {len(chunk)} bytes: {chunk.hex(' ')}")
 
     if all_data:
         print(f"\n✅ Total received: {len(all_data)} bytes")
         print(f"   Full data: {all_data.hex(' ')}")
 
         # Try to parse
-        if b'\x00\x00\xFF' in all_data:
+        preamble_idx = all_data.find(PREAMBLE)
+        if preamble_idx >= 0:
             print("\n🎉 Valid PN532 frame detected!")
 
-            # Look for firmware response signature
-            if b'\xD5\x03' in all_data:
-                idx = all_data.index(b'\xD5\x03')
+            # Look for firmware response signature (it can only follow the preamble)
+            idx = all_data.find(FW_MARKER, preamble_idx)
+            if idx >= 0:
                 if idx + 5 <= len(all_data):
                     ic = all_data[idx + 2]
                     ver = all_data[idx + 3]
@@ -140,7 +157,7 @@ try:
 
         # Try ONE more time with even longer wait
         print("\nRetrying with 2 second wait...")
-        ser.write(command)
+        ser.write(GET_FW_FRAME)
         time.sleep(2.0)
 
         if ser.in_waiting > 0:
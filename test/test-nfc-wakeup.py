@@ -1,10 +1,32 @@
 #!/usr/bin/env python3
 """Test PN532 with wake-up sequence that worked"""
+import select
 import serial
 import time
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+GARBAGE_WINDOW = 0.2  # How long to wait for stray bytes after the dummy data
+
+PREAMBLE = b'\x00\x00\xFF'
+FW_MARKER = b'\xD5\x03'  # TFI + GetFirmwareVersion response code
+
+def read_frames(ser):
+    """Collect frames up to the first non-ACK one; stray bytes before a preamble are kept"""
+    received = b''
+    while True:
+        chunk = ser.read_until(PREAMBLE)
+        received += chunk
+        if not chunk.endswith(PREAMBLE):
+            return received  # Port timeout with no (further) frame
+        lengths = ser.read(2)  # LEN, LCS
+        received += lengths
+        if len(lengths) < 2:
+            return received
+        if lengths == b'\x00\xFF':  # ACK: only the postamble follows
+            received += ser.read(1)
+            continue
+        return received + ser.read(lengths[0] + 2)
 
 print("🔧 Testing PN532 with wake-up sequence")
 print("="*50)
@@ -21,11 +43,12 @@ try:
 
     # Send some dummy data to "wake" the module
     ser.write(b'\x55\xAA\xFF\x00')
-    time.sleep(0.2)
 
-    # Clear any garbage
-    if ser.in_waiting > 0:
-        garbage = ser.read(ser.in_waiting)
+    # Clear any garbage: no framing to go by, so read until the line goes quiet
+    garbage = b''
+    while select.select([ser], [], [], GARBAGE_WINDOW)[0]:
+        garbage += ser.read(ser.in_waiting or 1)
+    if garbage:
         print(f"   Cleared {len(garbage)} bytes")
 
     # Now set DTR/RTS LOW (this is when it worked)
@@ -41,15 +64,14 @@ try:
     ])
 
     ser.write(get_fw)
-    time.sleep(0.5)  # Longer wait
+    response = read_frames(ser)
 
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting)
+    if response:
         print(f"✅ Got response: {response.hex(' ')}\n")
 
         # Parse it
-        if b'\xD5\x03' in response:
-            idx = response.index(b'\xD5\x03')
+        idx = response.find(FW_MARKER)
+        if idx >= 0:
             ic = response[idx + 2]
             ver = response[idx + 3]
             rev = response[idx + 4]
@@ -64,10 +86,9 @@ try:
 
         # Try one more thing - maybe it needs even MORE time
         print("\nStep 4: Trying with even longer delay...")
-        time.sleep(1)
+        response = read_frames(ser)
 
-        if ser.in_waiting > 0:
-            response = ser.read(ser.in_waiting)
+        if response:
             print(f"✅ Delayed response: {response.hex(' ')}")
         else:
             print("❌ No delayed response either")
@@ -80,10 +101,9 @@ try:
                 0xD4, 0x02, 0x2A, 0x00
             ])
             ser.write(wakeup)
-            time.sleep(0.5)
+            response = read_frames(ser)
 
-            if ser.in_waiting > 0:
-                response = ser.read(ser.in_waiting)
+            if response:
                 print(f"✅ Wake-up response: {response.hex(' ')}")
             else:
                 print("❌ No response to wake-up either")
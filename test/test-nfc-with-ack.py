@@ -4,28 +4,89 @@ PN532 test with proper ACK handling and control-line management
 Based on debug analysis - implements full PN532 UART protocol
 Updated to mimic Adafruit wake + SAM sequence and improve robustness
 """
+import functools
 import os
+import select
 import serial
+import struct
 import time
 
 # Allow env overrides and prefer provided port
 PORT = os.getenv('PORT', '/dev/tty.usbserial-ABSCDY4Z')
 BAUDRATE = int(os.getenv('BAUD', '115200'))
 
+# Frame packers keyed by command length: preamble, LEN, LCS, TFI, data, DCS, postamble
+_packers = {}
+
+@functools.lru_cache(maxsize=None)
+def build_frame(command_data):
+    """Build a host-to-PN532 frame: preamble + length + data + checksums"""
+    length = len(command_data) + 1  # +1 for TFI
+    lcs = (0x100 - length) & 0xFF
+    tfi = 0xD4  # Host to PN532
+    dcs = (0x100 - (tfi + sum(command_data))) & 0xFF
+    packer = _packers.get(len(command_data))
+    if packer is None:
+        packer = _packers[len(command_data)] = struct.Struct(f'>3sBBB{len(command_data)}sBB')
+    return packer.pack(b'\x00\x00\xFF', length, lcs, tfi, command_data, dcs, 0x00)
+
+# Fixed command frames, built once at import
+FRAME_GET_FW = build_frame(b'\x02')                 # GetFirmwareVersion
+FRAME_SAM_IRQ = build_frame(b'\x14\x01\x14\x01')    # SAMConfiguration, use IRQ
+FRAME_SAM_NOIRQ = build_frame(b'\x14\x01\x14\x00')  # SAMConfiguration, no IRQ
+
+# FTDI + PN532 can miss an ACK if the next command lands right on the heels
+# of a response; 1 ms between them is enough
+INTER_FRAME_GAP = 0.001
+_last_frame_at = 0.0  # monotonic time the last response frame was read
+
+def drain_input(ser):
+    """Discard stale bytes in the receive buffer (only needed around wake)"""
+    try:
+        ser.reset_input_buffer()
+    except Exception:
+        pass
+
+def send_frame(ser, frame):
+    """Send a prebuilt PN532 frame"""
+    gap = _last_frame_at + INTER_FRAME_GAP - time.monotonic()
+    if gap > 0:
+        time.sleep(gap)
+    # No input flush (it could drop a late reply to the previous command) and
+    # no flush() (callers wait for the reply anyway, so tcdrain() would only stall)
+    ser.write(frame)
+    return frame
+
+def send_command(ser, command_data):
+    """Send PN532 command frame"""
+    return send_frame(ser, build_frame(bytes(command_data)))
+
 def read_ack(ser, timeout=1.5):
-    """Read and verify ACK frame: 00 00 FF 00 FF 00 (scan-friendly)"""
-    deadline = time.time() + timeout
-    buf = b''
-    target = b'\x00\x00\xff\x00\xff\x00'
+    """Read and verify ACK frame: 00 00 FF 00 FF 00 (scan-friendly)
 
-    while time.time() < deadline:
-        chunk = ser.read(ser.in_waiting or 1)
-        if chunk:
-            buf += chunk
-            if target in buf:
-                return True
-        else:
-            time.sleep(0.005)  # brief yield
+    Reads no further than the ACK itself, so a response frame that arrives
+    right behind it is left in the buffer for read_frame().
+    """
+    now = time.monotonic  # Local: no attribute lookup per pass
+    deadline = now() + timeout
+    buf = bytearray()
+    target = b'\x00\x00\xff\x00\xff\x00'
+    fd = ser.fileno()
+
+    while True:
+        remaining = deadline - now()
+        if remaining <= 0 or not wait_ready(ser, remaining):
+            break
+        # Raw read on the (non-blocking) fd skips pyserial's read() wrapper
+        try:
+            chunk = os.read(fd, max(len(target) - len(buf), 1))
+        except BlockingIOError:
+            continue
+        if not chunk:
+            break  # Port went away
+        buf += chunk
+        if buf.endswith(target):
+            return True
 
     if buf:
         print(f"   ⚠️ Bytes seen (no ACK): {buf.hex(' ')}")
@@ -35,49 +96,59 @@ def read_ack(ser, timeout=1.5):
 
 def read_frame(ser, timeout=1.0):
     """Read PN532 response frame with proper parsing"""
-    end = time.time() + timeout
-
-    # Find preamble: 00 00 FF
-    preamble_found = False
-    while time.time() < end:
-        byte1 = ser.read(1)
-        if not byte1:
-            time.sleep(0.01)
+    global _last_frame_at
+    now = time.monotonic  # Local: no attribute lookup per pass
+    end = now() + timeout
+
+    # Find preamble: 00 00 FF, reading whatever has arrived and scanning in memory
+    buf = bytearray()
+    start = -1
+    fd = ser.fileno()
+    while True:
+        start = buf.find(b'\x00\x00\xFF')
+        if start >= 0 and len(buf) >= start + 5:
+            break
+        remaining = end - now()
+        if remaining <= 0 or not wait_ready(ser, remaining):
+            break
+        try:
+            chunk = os.read(fd, 4096)
+        except BlockingIOError:
             continue
+        if not chunk:
+            break  # Port went away
+        buf += chunk
 
-        if byte1 == b'\x00':
-            byte2 = ser.read(1)
-            byte3 = ser.read(1)
-            if byte2 == b'\x00' and byte3 == b'\xFF':
-                preamble_found = True
-                break
-
-    if not preamble_found:
+    if start < 0:
         print("   ❌ No preamble found")
         return None
 
-    # Read length and length checksum
-    length_bytes = ser.read(2)
-    if len(length_bytes) != 2:
+    # Length and length checksum follow the preamble
+    if len(buf) < start + 5:
         print("   ❌ Incomplete length bytes")
         return None
 
-    length = length_bytes[0]
-    lcs = length_bytes[1]
+    length = buf[start + 3]
+    lcs = buf[start + 4]
 
     # Verify length checksum
     if ((length + lcs) & 0xFF) != 0:
         print(f"   ❌ Invalid length checksum: {length:02X} + {lcs:02X}")
         return None
 
-    # Read data + data checksum
-    data = ser.read(length + 1)
+    # Data + data checksum, minus whatever already arrived with the header
+    frame_end = start + 5 + length + 1
+    if len(buf) < frame_end:
+        buf += ser.read(frame_end - len(buf))
+    data = buf[start + 5:frame_end]
     if len(data) != length + 1:
         print(f"   ❌ Incomplete data (expected {length + 1}, got {len(data)})")
         return None
 
+    _last_frame_at = now()
+
     # Strip TFI (first byte) and DCS (last byte), return payload
-    payload = data[1:-1]
+    payload = bytes(data[1:-1])
     return payload
 
 def wake_and_toggle(ser):
@@ -87,90 +158,81 @@ def wake_and_toggle(ser):
     # Assert control lines HIGH briefly
     ser.dtr = True
     ser.rts = True
-    time.sleep(0.1)
 
     # Send HSU wake bytes (commonly recognized)
     ser.write(b'\x55\x55\x00\x00\x00')
-    ser.flush()
-    time.sleep(0.2)
 
-    # Also send the prior "worked once" junk pattern
+    # Also send the prior "worked once" junk pattern; flush so it is on the
+    # wire before the control lines change
     ser.write(b'\x55\xAA\xFF\x00')
     ser.flush()
-    time.sleep(0.1)
 
     # Clear any garbage
-    if ser.in_waiting:
-        ser.read(ser.in_waiting)
+    drain_input(ser)
 
-    # Drop control lines LOW (critical for this board)
+    # Drop control lines LOW (critical for this board); the line drivers
+    # only need a moment to settle
     ser.dtr = False
     ser.rts = False
-    time.sleep(0.2)
+    time.sleep(0.05)
 
 def wait_ready(ser, timeout=1.0):
-    """Poll the UART like Adafruit's _wait_ready to avoid busy reads."""
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        if ser.in_waiting > 0:
+    """Block in select() until the UART has data, instead of polling in_waiting."""
+    if ser.in_waiting > 0:
+        return True
+    readable, _, _ = select.select([ser.fileno()], [], [], timeout)
+    return bool(readable)
+
+# Wake preambles: a short one for a module that is already awake, and the
+# long Adafruit stream that bridges wakeup from power-down
+SHORT_WAKE = b"\x55\x55\x00"
+LONG_WAKE = b"\x55\x55" + b"\x00" * 15
+AWAKE_ACK_TIMEOUT = 0.1  # An awake PN532 ACKs within a few ms at 115200
+
+def _short_wake(ser):
+    """Nudge an already-awake module; no settle time needed."""
+    drain_input(ser)
+    ser.write(SHORT_WAKE)
+
+def _long_wake(ser):
+    """Full Adafruit wake stream for a module in power-down."""
+    drain_input(ser)
+    ser.write(LONG_WAKE)
+    ser.flush()
+    time.sleep(0.02)
+
+def send_with_retry(ser, frame, tries=3, gap=0.015):
+    """Send a frame and wait for its ACK, resending the same frame on a miss.
+
+    Per the PN532 manual a missing ACK is recovered by resending the command,
+    so the full wake_and_toggle() only runs once the quick resends run out.
+    """
+    for attempt in range(tries):
+        if attempt:
+            time.sleep(gap)
+        send_frame(ser, frame)
+        if read_ack(ser, timeout=AWAKE_ACK_TIMEOUT):
             return True
-        time.sleep(0.01)
-    return False
+    wake_and_toggle(ser)
+    send_frame(ser, frame)
+    return read_ack(ser, timeout=1.5)
 
 def adafruit_style_wakeup_and_sam(ser):
     """Mimic Adafruit PN532_UART._wakeup() + SAM_configuration()."""
-    # Ensure low power flag equivalent: always perform wake on first call
-    # Write long wake stream (per Adafruit): 0x55 0x55 followed by many 0x00
-    ser.reset_input_buffer()
-    ser.write(b"\x55\x55" + b"\x00" * 15)
-    ser.flush()
-    time.sleep(0.02)
-
-    # Immediately send SAMConfiguration and verify ACK/response
-    sam_cmd = bytearray([0x14, 0x01, 0x14, 0x01])
-    frame = send_command(ser, sam_cmd)
-    if not wait_ready(ser, timeout=1.0):
-        return False
-    if not read_ack(ser, timeout=1.5):
-        return False
+    # Try the short wake first; only pay for the long stream if it goes unanswered
+    _short_wake(ser)
+    send_frame(ser, FRAME_SAM_IRQ)
+    if not read_ack(ser, timeout=AWAKE_ACK_TIMEOUT):
+        print("   ↻ No ACK after short wake, retrying with long wake stream...")
+        # Write long wake stream (per Adafruit): 0x55 0x55 followed by many 0x00
+        _long_wake(ser)
+        send_frame(ser, FRAME_SAM_IRQ)
+        if not read_ack(ser, timeout=1.5):
+            return False
     # Wait for SAM response
-    if not wait_ready(ser, timeout=1.0):
-        return False
     resp = read_frame(ser, timeout=1.5)
     return resp is not None
 
-def send_command(ser, command_data):
-    """Send PN532 command frame"""
-    # Build frame: preamble + length + data + checksums
-    preamble = b'\x00\x00\xFF'
-    length = len(command_data) + 1  # +1 for TFI
-    lcs = (0x100 - length) & 0xFF
-    tfi = 0xD4  # Host to PN532
-
-    # Calculate data checksum
-    dcs = (0x100 - (tfi + sum(command_data))) & 0xFF
-
-    # Build complete frame
-    frame = bytearray(preamble)
-    frame.append(length)
-    frame.append(lcs)
-    frame.append(tfi)
-    frame.extend(command_data)
-    frame.append(dcs)
-    frame.append(0x00)  # Postamble
-
-    # Clear any stale bytes before sending (Adafruit does this)
-    try:
-        ser.reset_input_buffer()
-    except Exception:
-        pass
-    ser.write(frame)
-    try:
-        ser.flush()
-    except Exception:
-        pass
-    return frame
-
 print("🔧 PN532 Test with Proper ACK Handling")
 print("="*60)
 print(f"Port: {PORT}")
@@ -218,22 +280,16 @@ try:
     wake_and_toggle(ser)
 
     # Send command
-    cmd = bytearray([0x02])  # GetFirmwareVersion command code
-    frame = send_command(ser, cmd)
+    frame = send_frame(ser, FRAME_GET_FW)
     print(f"📤 Sent: {frame.hex(' ')}")
 
-    time.sleep(0.15)  # Give module time to process
-
-    # Read ACK
+    # Read ACK (read_ack blocks until the module answers)
     print("📥 Reading ACK...")
-    # Poll for readiness first (like Adafruit)
-    wait_ready(ser, timeout=1.0)
     if read_ack(ser, timeout=1.5):
         print("   ✅ ACK received!")
 
         # Read response frame
         print("📥 Reading response frame...")
-        wait_ready(ser, timeout=1.0)
         response = read_frame(ser, timeout=1.5)
 
         if response:
@@ -274,14 +330,10 @@ try:
     wake_and_toggle(ser)
 
     # SAM Configuration: normal mode, 1 sec timeout, use IRQ
-    sam_cmd = bytearray([0x14, 0x01, 0x14, 0x01])
-    frame = send_command(ser, sam_cmd)
-    print(f"📤 Sent: {frame.hex(' ')}")
+    print(f"📤 Sent: {FRAME_SAM_IRQ.hex(' ')}")
 
-    time.sleep(0.15)
-
-    print("📥 Reading ACK...")
-    if read_ack(ser, timeout=1.5):
+    print("📥 Reading ACK (resending on a miss)...")
+    if send_with_retry(ser, FRAME_SAM_IRQ):
         print("   ✅ SAM ACK received!")
 
         print("📥 Reading SAM response...")
@@ -295,13 +347,10 @@ try:
     else:
         print("   ❌ No SAM ACK")
 
-        # Optional retry: try SAM without IRQ flag
+        # Optional retry: try SAM without IRQ flag (module was just re-woken)
         print("   ↻ Retrying SAM without IRQ (0x00)...")
-        wake_and_toggle(ser)
-        sam_cmd_no_irq = bytearray([0x14, 0x01, 0x14, 0x00])
-        frame = send_command(ser, sam_cmd_no_irq)
+        frame = send_frame(ser, FRAME_SAM_NOIRQ)
         print(f"📤 Sent: {frame.hex(' ')}")
-        time.sleep(0.15)
         print("📥 Reading ACK...")
         if read_ack(ser, timeout=1.5):
             print("   ✅ SAM(no IRQ) ACK received!")
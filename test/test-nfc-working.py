@@ -6,6 +6,42 @@ import time
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
 
+ACK_FRAME = b'\x00\x00\xFF\x00\xFF\x00'
+FW_MARKER = b'\xD5\x03'  # TFI + GetFirmwareVersion response code
+
+# Frames sent by the tests (fixed, so built once at import)
+GET_FW_FRAME = bytes([
+    0x00, 0x00, 0xFF,  # Preamble
+    0x02,              # Length
+    0xFE,              # Length checksum
+    0xD4,              # Direction
+    0x02,              # GetFirmwareVersion
+    0x2A,              # Data checksum
+    0x00               # Postamble
+])
+
+SAM_CONFIG_FRAME = bytes([
+    0x00, 0x00, 0xFF,  # Preamble
+    0x05,              # Length
+    0xFB,              # Length checksum
+    0xD4, 0x14,        # SAMConfiguration
+    0x01,              # Normal mode
+    0x14,              # Timeout
+    0x01,              # Use IRQ
+    0xFE,              # Data checksum
+    0x00               # Postamble
+])
+
+def read_reply(ser):
+    """Return the ACK and the response frame after it (b'' if nothing came)"""
+    reply = ser.read(len(ACK_FRAME))
+    if reply != ACK_FRAME:
+        return reply
+    header = ser.read(5)  # 00 00 FF LEN LCS
+    if len(header) < 5:
+        return reply + header
+    return reply + header + ser.read(header[3] + 2)
+
 print("🔧 Testing PN532 NFC Module (with DTR/RTS fix)")
 print("="*50)
 print(f"Port: {PORT}")
@@ -24,28 +60,17 @@ try:
 
     # Test 1: GetFirmwareVersion
     print("TEST 1: Getting firmware version...")
-    get_fw = bytearray([
-        0x00, 0x00, 0xFF,  # Preamble
-        0x02,              # Length
-        0xFE,              # Length checksum
-        0xD4,              # Direction
-        0x02,              # GetFirmwareVersion
-        0x2A,              # Data checksum
-        0x00               # Postamble
-    ])
-
-    ser.write(get_fw)
-    time.sleep(0.3)
-
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting)
+    ser.write(GET_FW_FRAME)
+    response = read_reply(ser)
+
+    if response:
         print(f"✅ Response: {response.hex(' ')}\n")
 
         # Parse firmware info
         try:
             # Find the actual data (skip ACK frame if present)
-            if b'\xD5\x03' in response:
-                idx = response.index(b'\xD5\x03')
+            idx = response.find(FW_MARKER)
+            if idx >= 0:
                 ic = response[idx + 2]
                 ver = response[idx + 3]
                 rev = response[idx + 4]
@@ -62,23 +87,10 @@ try:
 
     # Test 2: SAM Configuration
     print("\nTEST 2: Configuring SAM...")
-    sam_config = bytearray([
-        0x00, 0x00, 0xFF,  # Preamble
-        0x05,              # Length
-        0xFB,              # Length checksum
-        0xD4, 0x14,        # SAMConfiguration
-        0x01,              # Normal mode
-        0x14,              # Timeout
-        0x01,              # Use IRQ
-        0xFE,              # Data checksum
-        0x00               # Postamble
-    ])
-
-    ser.write(sam_config)
-    time.sleep(0.3)
-
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting)
+    ser.write(SAM_CONFIG_FRAME)
+    response = read_reply(ser)
+
+    if response:
         print(f"✅ SAM configured: {response.hex(' ')}")
     else:
         print("⚠️  No SAM response (might be okay)")
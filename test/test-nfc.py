@@ -6,6 +6,19 @@ import time
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
 
+# GetFirmwareVersion frame (fixed, so built once at import)
+GET_FW_FRAME = bytes([
+    0x00, 0x00, 0xFF,  # Preamble
+    0x02,              # Length
+    0xFE,              # Length checksum (0x100 - 0x02)
+    0xD4,              # Direction (host to PN532)
+    0x02,              # GetFirmwareVersion command
+    0x2A,              # Data checksum (0x100 - 0xD4 - 0x02)
+    0x00               # Postamble
+])
+
+ACK_FRAME = b'\x00\x00\xFF\x00\xFF\x00'
+
 print("🔧 Testing PN532 NFC Module")
 print(f"Port: {PORT}")
 print(f"Baudrate: {BAUDRATE}\n")
@@ -20,24 +33,22 @@ try:
     # Frame: Preamble + Length + Command + Checksum + Postamble
     print("📡 Sending GetFirmwareVersion command to PN532...")
 
-    command = bytearray([
-        0x00, 0x00, 0xFF,  # Preamble
-        0x02,              # Length
-        0xFE,              # Length checksum (0x100 - 0x02)
-        0xD4,              # Direction (host to PN532)
-        0x02,              # GetFirmwareVersion command
-        0x2A,              # Data checksum (0x100 - 0xD4 - 0x02)
-        0x00               # Postamble
-    ])
-
-    ser.write(command)
+    ser.write(GET_FW_FRAME)
     print("   Command sent, waiting for response...\n")
 
-    # Wait for response
-    time.sleep(0.5)
+    # The PN532 sends an ACK first, then the response frame. Byte 3 of the
+    # frame header is LEN, so the rest (data + DCS + postamble) is LEN + 2.
+    ack = ser.read(len(ACK_FRAME))
+    response = b''
+    if ack == ACK_FRAME:
+        print("   ACK received")
+        header = ser.read(5)
+        if len(header) == 5:
+            response = header + ser.read(header[3] + 2)
+    elif ack:
+        response = ack + ser.read(ser.in_waiting)
 
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting)
+    if response:
         print(f"✅ Received {len(response)} bytes from PN532:")
         print(f"   Raw: {response.hex(' ')}\n")
 
@@ -5,6 +5,38 @@ import time
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+RESPONSE_TIMEOUT = 0.3  # Serial read timeout while a reply is expected
+LINE_SETTLE = 0.05  # After changing DTR/RTS, let the line drivers settle
+
+ACK_HEADER = b'\x00\x00\xFF\x00\xFF'  # ACK frame minus its postamble
+FW_MARKER = b'\xD5\x03'  # TFI + GetFirmwareVersion response code
+
+# GetFirmwareVersion
+GET_FW_FRAME = bytes([0x00, 0x00, 0xFF, 0x02, 0xFE, 0xD4, 0x02, 0x2A, 0x00])
+
+def read_reply(ser, timeout=RESPONSE_TIMEOUT):
+    """Read an optional ACK and the frame behind it, sized by the LEN byte.
+
+    Anything that doesn't start with a PN532 header is returned as-is along
+    with whatever else is already buffered, so line noise still shows up.
+    """
+    ser.timeout = timeout
+    reply = b''
+    header = ser.read(5)
+    if header == ACK_HEADER:
+        reply = header + ser.read(1)
+        header = ser.read(5)
+    if len(header) == 5 and header[:3] == b'\x00\x00\xFF':
+        return reply + header + ser.read(header[3] + 2)
+    return reply + header + ser.read(ser.in_waiting)
+
+def probe(ser, dtr, rts, frame, timeout=RESPONSE_TIMEOUT):
+    """Send frame with the given control-line state; returns the reply or None"""
+    ser.dtr = dtr
+    ser.rts = rts
+    time.sleep(LINE_SETTLE)
+    ser.write(frame)
+    return read_reply(ser, timeout) or None
 
 print("🔍 Testing raw serial communication quality\n")
 
@@ -16,10 +48,11 @@ try:
     print("\nTest 1: Checking for echo...")
     test_bytes = b'\x55\xAA\xFF\x00'
     ser.write(test_bytes)
-    time.sleep(0.2)
+    ser.timeout = 0.2
+    received = ser.read(len(test_bytes))  # An echo is exactly this long
+    received += ser.read(ser.in_waiting)
 
-    if ser.in_waiting > 0:
-        received = ser.read(ser.in_waiting)
+    if received:
         print(f"   Got {len(received)} bytes back: {received.hex(' ')}")
         if received == test_bytes:
             print("   ⚠️  Perfect echo detected - module might be in wrong mode")
@@ -31,10 +64,9 @@ try:
     # Test 2: Send continuous data
     print("\nTest 2: Sending continuous stream...")
     ser.write(b'\xFF' * 100)
-    time.sleep(0.3)
+    response = read_reply(ser)
 
-    if ser.in_waiting > 0:
-        response = ser.read(ser.in_waiting)
+    if response:
         print(f"   ✅ Got {len(response)} bytes response")
         print(f"   First 20 bytes: {response[:20].hex(' ')}")
     else:
@@ -44,30 +76,23 @@ try:
     print("\nTest 3: Toggling control lines...")
 
     # Try with DTR low
-    ser.dtr = False
-    ser.rts = False
-    time.sleep(0.1)
-    ser.write(bytearray([0x00, 0x00, 0xFF, 0x02, 0xFE, 0xD4, 0x02, 0x2A, 0x00]))
-    time.sleep(0.3)
-
-    if ser.in_waiting > 0:
+    data = probe(ser, False, False, GET_FW_FRAME)
+    if data:
         print(f"   ✅ Response with DTR/RTS LOW")
-        print(f"   Data: {ser.read(ser.in_waiting).hex(' ')}")
+        print(f"   Data: {data.hex(' ')}")
     else:
         print("   No response with DTR/RTS low")
 
-    # Try with DTR high, RTS low
-    ser.dtr = True
-    ser.rts = False
-    time.sleep(0.1)
-    ser.write(bytearray([0x00, 0x00, 0xFF, 0x02, 0xFE, 0xD4, 0x02, 0x2A, 0x00]))
-    time.sleep(0.3)
-
-    if ser.in_waiting > 0:
-        print(f"   ✅ Response with DTR HIGH, RTS LOW")
-        print(f"   Data: {ser.read(ser.in_waiting).hex(' ')}")
+    # Try with DTR high, RTS low, unless LOW already got a firmware reply
+    if data and FW_MARKER in data:
+        print("   Firmware reply with DTR/RTS LOW - skipping DTR high")
     else:
-        print("   No response with DTR high")
+        data = probe(ser, True, False, GET_FW_FRAME)
+        if data:
+            print(f"   ✅ Response with DTR HIGH, RTS LOW")
+            print(f"   Data: {data.hex(' ')}")
+        else:
+            print("   No response with DTR high")
 
     ser.close()
 
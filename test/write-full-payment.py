@@ -10,6 +10,16 @@ from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+# Adafruit reads fixed-size frames, so short replies wait out the full timeout
+SERIAL_TIMEOUT = 0.1
+
+# Tag polling: short detection windows with a small backoff between them
+TAG_WAIT_S = 30  # How long to wait for a tag overall
+TAG_POLL_TIMEOUT = 0.2  # read_passive_target() window per attempt
+POLL_BACKOFF_MIN = 0.02
+POLL_BACKOFF_MAX = 0.2
+
+now_ms = time.time_ns() // 1_000_000
 
 # FastPay payment request (compact format to fit on tag)
 payment = {
@@ -22,8 +32,8 @@ payment = {
         "cur": "USD",
         "fiat": "5.00",
         "desc": "Latte",
-        "nonce": str(int(time.time() * 1000)),
-        "exp": str(int((time.time() + 180) * 1000))
+        "nonce": str(now_ms),
+        "exp": str(now_ms + 180_000)
     },
     "sig": "0x1234abcd"  # Mock signature
 }
@@ -48,19 +58,22 @@ def write_ntag_payload(pn532, uid, payload_bytes):
         payload_bytes = payload_bytes[:144]
         pages_needed = 36
 
+    # Pad once up front; memoryview slices hand out each page without copying
+    padded = memoryview(bytes(payload_bytes).ljust(pages_needed * bytes_per_page, b'\x00'))
+
     # Write each page
+    write_block = pn532.ntag2xx_write_block
     for i in range(pages_needed):
         page_num = start_page + i
-        start_idx = i * bytes_per_page
-        end_idx = min(start_idx + bytes_per_page, len(payload_bytes))
-
-        # Get 4 bytes (pad if needed)
-        chunk = payload_bytes[start_idx:end_idx]
-        chunk = chunk.ljust(bytes_per_page, b'\x00')
+        chunk = padded[i * bytes_per_page:(i + 1) * bytes_per_page]
 
         try:
-            pn532.ntag2xx_write_block(page_num, chunk)
-            print(f"   ✅ Page {page_num}: {chunk.hex()}")
+            write_block(page_num, chunk)
+            # Only print first few and last few pages to reduce spam
+            if i < 3 or i >= pages_needed - 2:
+                print(f"   ✅ Page {page_num}: {chunk.hex()}")
+            elif i == 3:
+                print(f"   ... (writing pages {page_num} to {start_page + pages_needed - 3}) ...")
         except Exception as e:
             print(f"   ❌ Page {page_num} failed: {e}")
             return False
@@ -72,7 +85,14 @@ print("="*60)
 
 try:
     # Setup
-    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=1)
+    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=SERIAL_TIMEOUT)
+
+    # Drop the USB-serial latency timer to ~1 ms where the driver supports it
+    try:
+        uart.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass
+
     uart.dtr = False
     uart.rts = False
     time.sleep(0.2)
@@ -83,8 +103,9 @@ try:
 
     pn532.SAM_configuration()
 
-    # Create compact JSON (no whitespace)
+    # Create compact JSON (no whitespace) and its tag payload once, ahead of the polling loop
     payment_json = json.dumps(payment, separators=(',', ':'))
+    payload = payment_json.encode('utf-8')
 
     print("Payment Request:")
     print("-" * 60)
@@ -101,8 +122,11 @@ try:
     tag_found = False
     attempts = 0
 
-    while not tag_found and attempts < 30:
-        uid = pn532.read_passive_target(timeout=0.5)
+    started = time.monotonic_ns()
+    deadline = started + TAG_WAIT_S * 1_000_000_000
+    delay = POLL_BACKOFF_MIN
+    while not tag_found and time.monotonic_ns() < deadline:
+        uid = pn532.read_passive_target(timeout=TAG_POLL_TIMEOUT)
 
         if uid and len(uid) == 4:
             uid_hex = uid.hex().upper()
@@ -119,7 +143,6 @@ try:
             # Write payment request
             print("\n📝 Writing payment request...")
 
-            payload = payment_json.encode('utf-8')
             success = write_ntag_payload(pn532, uid, payload)
 
             if success:
@@ -130,19 +153,20 @@ try:
                 # Verify by reading back
                 print("\n📖 Verifying write...")
                 try:
-                    # Read first few pages to verify
-                    read_back = bytearray()
-                    for page in range(4, 8):  # Read first 16 bytes
-                        data = pn532.ntag2xx_read_block(page)
-                        read_back.extend(data)
+                    # NTAG READ returns 4 pages (16 bytes) per exchange, so
+                    # pages 4-7 come back in one round trip
+                    read_back = pn532.mifare_classic_read_block(4)
 
-                    read_text = read_back.decode('utf-8', errors='ignore')
-                    print(f"   Read back: {read_text[:50]}...")
-
-                    if read_text.startswith('{"v":1'):
-                        print("\n   ✅ Verification successful!")
+                    if read_back is None:
+                        print("   ⚠️  Read-back failed (no response from tag)")
                     else:
-                        print("\n   ⚠️  Read back doesn't match expected format")
+                        # Decoded only for the preview; the format check runs on the raw bytes
+                        print(f"   Read back: {read_back.decode('utf-8', errors='ignore')[:50]}...")
+
+                        if read_back.startswith(b'{"v":1'):
+                            print("\n   ✅ Verification successful!")
+                        else:
+                            print("\n   ⚠️  Read back doesn't match expected format")
 
                 except Exception as e:
                     print(f"   ⚠️  Verification failed: {e}")
@@ -162,9 +186,12 @@ try:
 
         attempts += 1
         if attempts % 5 == 0 and not tag_found:
-            print(f"   Still waiting... ({attempts}/30)")
+            waited = (time.monotonic_ns() - started) // 1_000_000_000
+            print(f"   Still waiting... ({waited}s/{TAG_WAIT_S}s)")
+            delay = POLL_BACKOFF_MIN
 
-        time.sleep(0.5)
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_BACKOFF_MAX)
 
     if not tag_found:
         print("\n⏱️  No NTAG tag detected")
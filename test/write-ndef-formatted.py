@@ -5,11 +5,18 @@ NDEF = NFC Data Exchange Format (the standard phones understand)
 """
 import serial
 import json
+import struct
 import time
 from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+SERIAL_TIMEOUT = 0.1
+
+TAG_WAIT_S = 30
+TAG_POLL_TIMEOUT = 0.2  # Per-attempt detection window
+POLL_BACKOFF_MIN = 0.02  # Pause after a miss; doubles up to the max
+POLL_BACKOFF_MAX = 0.2
 
 # Compact payment (must fit in 144 bytes total with NDEF overhead)
 payment = {
@@ -21,6 +28,8 @@ payment = {
     "time": int(time.time())
 }
 
+NDEF_TEXT_HEADER = struct.Struct('>BBBBB2s')
+
 def create_ndef_text_record(text):
     """
     Create NDEF Text Record that phones can read
@@ -37,23 +46,15 @@ def create_ndef_text_record(text):
     # Bits 2-0: TNF (Type Name Format) = 001 (Well-known)
     header = 0xD1  # 11010001
 
-    type_field = b'T'  # Text record
-    type_length = len(type_field)
-
-    # Language code (0x02 = UTF-8, 'en')
-    language = b'\x02en'
-    payload = language + text_bytes
-    payload_length = len(payload)
-
-    # Build NDEF record
-    record = bytearray()
-    record.append(header)
-    record.append(type_length)
-    record.append(payload_length)
-    record.extend(type_field)
-    record.extend(payload)
-
-    return bytes(record)
+    # Type 'T' (Text record), then language (0x02 = UTF-8, 'en') ahead of the text
+    return NDEF_TEXT_HEADER.pack(
+        header,
+        0x01,  # Type length
+        len(text_bytes) + 3,  # Payload length (includes language)
+        0x54,  # Type: 'T' (Text)
+        0x02,  # Language length
+        b'en',  # Language code
+    ) + text_bytes
 
 def create_ndef_message(text):
     """
@@ -69,36 +70,30 @@ def create_ndef_message(text):
     # Length: size of NDEF record
     # Value: the NDEF record
 
-    tlv = bytearray()
-    tlv.append(0x03)  # NDEF Message TLV
-
     if len(ndef_record) < 255:
-        tlv.append(len(ndef_record))  # 1-byte length
+        length = bytes([len(ndef_record)])  # 1-byte length
     else:
-        tlv.append(0xFF)  # Extended length marker
-        tlv.extend(len(ndef_record).to_bytes(2, 'big'))
+        length = b'\xFF' + len(ndef_record).to_bytes(2, 'big')  # Extended length marker
 
-    tlv.extend(ndef_record)
-    tlv.append(0xFE)  # Terminator TLV
+    # NDEF Message TLV + record + Terminator TLV, in one allocation
+    return b''.join((b'\x03', length, ndef_record, b'\xFE'))
 
-    return bytes(tlv)
+# NTAG213 Capability Container (CC)
+# Byte 0: Magic number (0xE1)
+# Byte 1: Version (0x10 = v1.0)
+# Byte 2: Memory size (0x12 = 144 bytes for NTAG213)
+# Byte 3: Read/Write access (0x00 = full access)
+NTAG213_CC = b'\xE1\x10\x12\x00'
 
 def format_ntag_for_ndef(pn532, uid):
     """
     Write NDEF capability container to page 3
     Required for phones to recognize this as an NDEF tag
     """
-    # NTAG213 Capability Container (CC)
-    # Byte 0: Magic number (0xE1)
-    # Byte 1: Version (0x10 = v1.0)
-    # Byte 2: Memory size (0x12 = 144 bytes for NTAG213)
-    # Byte 3: Read/Write access (0x00 = full access)
-    cc = bytearray([0xE1, 0x10, 0x12, 0x00])
-
     print("   Formatting tag for NDEF...")
     try:
-        pn532.ntag2xx_write_block(3, cc)
-        print(f"   ✅ Capability Container written: {cc.hex()}")
+        pn532.ntag2xx_write_block(3, NTAG213_CC)
+        print(f"   ✅ Capability Container written: {NTAG213_CC.hex()}")
         return True
     except Exception as e:
         print(f"   ❌ CC write failed: {e}")
@@ -114,12 +109,9 @@ def write_ndef_to_ntag(pn532, uid, ndef_message):
     start_page = 4
     bytes_per_page = 4
 
-    # Pad to multiple of 4
-    padded = bytearray(ndef_message)
-    while len(padded) % bytes_per_page != 0:
-        padded.append(0x00)
-
-    pages_needed = len(padded) // bytes_per_page
+    # Pad to multiple of 4 once; memoryview slices hand out each page without copying
+    pages_needed = (len(ndef_message) + bytes_per_page - 1) // bytes_per_page
+    padded = memoryview(bytes(ndef_message).ljust(pages_needed * bytes_per_page, b'\x00'))
     print(f"   Pages needed: {pages_needed}")
 
     if pages_needed > 36:  # NTAG213 limit
@@ -127,13 +119,14 @@ def write_ndef_to_ntag(pn532, uid, ndef_message):
         return False
 
     # Write each page
+    write_block = pn532.ntag2xx_write_block
     for i in range(pages_needed):
         page_num = start_page + i
         start_idx = i * bytes_per_page
         chunk = padded[start_idx:start_idx + bytes_per_page]
 
         try:
-            pn532.ntag2xx_write_block(page_num, bytes(chunk))
+            write_block(page_num, chunk)
             # Only print first few and last few pages to reduce spam
             if i < 3 or i >= pages_needed - 2:
                 print(f"   ✅ Page {page_num}: {chunk.hex()}")
@@ -150,7 +143,13 @@ print("="*60)
 
 try:
     # Setup
-    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=1)
+    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=SERIAL_TIMEOUT)
+
+    try:
+        uart.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass
+
     uart.dtr = False
     uart.rts = False
     time.sleep(0.2)
@@ -198,8 +197,11 @@ try:
     tag_found = False
     attempts = 0
 
-    while not tag_found and attempts < 30:
-        uid = pn532.read_passive_target(timeout=0.5)
+    started = time.monotonic_ns()
+    deadline = started + TAG_WAIT_S * 1_000_000_000
+    delay = POLL_BACKOFF_MIN
+    while not tag_found and time.monotonic_ns() < deadline:
+        uid = pn532.read_passive_target(timeout=TAG_POLL_TIMEOUT)
 
         if uid and len(uid) == 4:
             uid_hex = uid.hex().upper()
@@ -222,17 +224,21 @@ try:
                 # Verify
                 print("\n📖 Verifying...")
                 try:
-                    cc = pn532.ntag2xx_read_block(3)
-                    print(f"   CC (page 3): {cc.hex()}")
-
-                    page4 = pn532.ntag2xx_read_block(4)
-                    print(f"   Data start (page 4): {page4.hex()}")
+                    # NTAG READ returns 4 pages, so CC and data start share one round trip
+                    pages = pn532.mifare_classic_read_block(3)
 
-                    # Check if it's NDEF formatted
-                    if cc[0] == 0xE1:
-                        print("   ✅ NDEF format confirmed!")
+                    if pages is None:
+                        print("   ⚠️  Read-back failed (no response from tag)")
                     else:
-                        print(f"   ⚠️  Unexpected CC: {cc.hex()}")
+                        cc, page4 = pages[0:4], pages[4:8]
+                        print(f"   CC (page 3): {cc.hex()}")
+                        print(f"   Data start (page 4): {page4.hex()}")
+
+                        # Check if it's NDEF formatted
+                        if cc[0] == 0xE1:
+                            print("   ✅ NDEF format confirmed!")
+                        else:
+                            print(f"   ⚠️  Unexpected CC: {cc.hex()}")
 
                 except Exception as e:
                     print(f"   ⚠️  Verify failed: {e}")
@@ -254,9 +260,12 @@ try:
 
         attempts += 1
         if attempts % 5 == 0 and not tag_found:
-            print(f"   Waiting... ({attempts}/30)")
+            waited = (time.monotonic_ns() - started) // 1_000_000_000
+            print(f"   Waiting... ({waited}s/{TAG_WAIT_S}s)")
+            delay = POLL_BACKOFF_MIN
 
-        time.sleep(0.5)
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_BACKOFF_MAX)
 
     if not tag_found:
         print("\n⏱️  No tag detected")
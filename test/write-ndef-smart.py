@@ -5,11 +5,18 @@ Many NTAG tags come pre-formatted, so we just write data
 """
 import serial
 import json
+import struct
 import time
 from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+SERIAL_TIMEOUT = 0.1
+
+TAG_WAIT_S = 20  # Give up on the tag after this long
+TAG_POLL_TIMEOUT = 0.2
+POLL_BACKOFF_MIN = 0.02
+POLL_BACKOFF_MAX = 0.2
 
 payment = {
     "v": 1,
@@ -20,32 +27,28 @@ payment = {
     "time": int(time.time())
 }
 
+NDEF_TEXT_HEADER = struct.Struct('>BBBBB2s')
+
 def create_ndef_text_record(text):
     """Create NDEF Text Record"""
     text_bytes = text.encode('utf-8')
-    header = 0xD1  # MB=1, ME=1, SR=1, TNF=Well-known
-    type_field = b'T'
-    language = b'\x02en'
-    payload = language + text_bytes
-
-    record = bytearray()
-    record.append(header)
-    record.append(len(type_field))
-    record.append(len(payload))
-    record.extend(type_field)
-    record.extend(payload)
-    return bytes(record)
+    return NDEF_TEXT_HEADER.pack(
+        0xD1,  # MB=1, ME=1, SR=1, TNF=Well-known
+        0x01,  # Type length
+        len(text_bytes) + 3,  # Payload length (includes language)
+        0x54,  # Type: 'T'
+        0x02,  # Language length (UTF-8)
+        b'en',
+    ) + text_bytes
 
 def create_ndef_message(text):
     """Create TLV-wrapped NDEF message"""
     ndef_record = create_ndef_text_record(text)
+    # NDEF Message TLV + record + Terminator
+    return b''.join((b'\x03', bytes([len(ndef_record)]), ndef_record, b'\xFE'))
 
-    tlv = bytearray()
-    tlv.append(0x03)  # NDEF Message
-    tlv.append(len(ndef_record))
-    tlv.extend(ndef_record)
-    tlv.append(0xFE)  # Terminator
-    return bytes(tlv)
+# NTAG213 Capability Container: magic, v1.0, 144 bytes, full read/write access
+NTAG213_CC = b'\xE1\x10\x12\x00'
 
 def check_ndef_formatted(pn532, uid):
     """Check if tag is already NDEF formatted"""
@@ -70,23 +73,21 @@ def write_ndef_data(pn532, uid, ndef_message):
     """Write NDEF data starting at page 4"""
     print(f"   Writing {len(ndef_message)} bytes...")
 
-    # Pad to 4-byte boundary
-    padded = bytearray(ndef_message)
-    while len(padded) % 4 != 0:
-        padded.append(0x00)
-
-    pages = len(padded) // 4
+    # Pad to 4-byte boundary once; memoryview slices hand out each page without copying
+    pages = (len(ndef_message) + 3) // 4
+    padded = memoryview(bytes(ndef_message).ljust(pages * 4, b'\x00'))
     print(f"   Pages to write: {pages}")
 
     success_count = 0
     fail_count = 0
 
+    write_block = pn532.ntag2xx_write_block
     for i in range(pages):
         page_num = 4 + i
         chunk = padded[i*4:(i+1)*4]
 
         try:
-            pn532.ntag2xx_write_block(page_num, bytes(chunk))
+            write_block(page_num, chunk)
             success_count += 1
 
             # Show progress
@@ -108,7 +109,13 @@ print("="*60)
 
 try:
     # Setup
-    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=1)
+    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=SERIAL_TIMEOUT)
+
+    try:
+        uart.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass
+
     uart.dtr = False
     uart.rts = False
     time.sleep(0.2)
@@ -132,8 +139,11 @@ try:
     print()
 
     attempts = 0
-    while attempts < 20:
-        uid = pn532.read_passive_target(timeout=0.5)
+    started = time.monotonic_ns()
+    deadline = started + TAG_WAIT_S * 1_000_000_000
+    delay = POLL_BACKOFF_MIN
+    while time.monotonic_ns() < deadline:
+        uid = pn532.read_passive_target(timeout=TAG_POLL_TIMEOUT)
 
         if uid and len(uid) == 4:
             uid_hex = uid.hex().upper()
@@ -146,8 +156,7 @@ try:
                 print("\n   Tag not NDEF formatted.")
                 print("   Trying to format page 3...")
                 try:
-                    cc = bytearray([0xE1, 0x10, 0x12, 0x00])
-                    pn532.ntag2xx_write_block(3, cc)
+                    pn532.ntag2xx_write_block(3, NTAG213_CC)
                     print(f"   ✅ Formatted!")
                 except:
                     print(f"   ❌ Can't write page 3 (might be locked)")
@@ -163,16 +172,13 @@ try:
                 # Try to read back
                 print("\n📖 Reading back...")
                 try:
-                    data = bytearray()
-                    for p in range(4, 8):
-                        page_data = pn532.ntag2xx_read_block(p)
-                        if page_data:
-                            data.extend(page_data)
+                    # NTAG READ returns pages 4-7 in one round trip
+                    data = pn532.mifare_classic_read_block(4) or b''
 
-                    text = data.decode('utf-8', errors='ignore').rstrip('\x00')
+                    text = data.rstrip(b'\x00').decode('utf-8', errors='ignore')
                     print(f"   Read: {text[:80]}...")
 
-                    if '{"v":1' in text:
+                    if b'{"v":1' in data:
                         print("\n   ✅ Looks good!")
                 except Exception as e:
                     print(f"   ⚠️  {e}")
@@ -190,8 +196,12 @@ try:
 
         attempts += 1
         if attempts % 5 == 0:
-            print(f"   Waiting... ({attempts}/20)")
-        time.sleep(0.5)
+            waited = (time.monotonic_ns() - started) // 1_000_000_000
+            print(f"   Waiting... ({waited}s/{TAG_WAIT_S}s)")
+            delay = POLL_BACKOFF_MIN
+
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_BACKOFF_MAX)
 
     uart.close()
     print("\n✅ Done")
@@ -5,11 +5,47 @@ Test by reading with any NFC app on your phone
 """
 import serial
 import json
+import select
 import time
 from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+SERIAL_TIMEOUT = 0.1
+
+# PN532 target-mode commands (not wrapped by adafruit_pn532)
+TG_INIT_AS_TARGET = 0x8C
+TG_GET_DATA = 0x86
+TG_SET_DATA = 0x8E
+LISTEN_POLL_S = 1.0  # select() window while armed as a target
+
+# TgInitAsTarget parameters (fixed, so built once at import)
+# Note: This is simplified - full implementation needs proper Type 4 Tag formatting
+TG_INIT_AS_TARGET_PARAMS = bytes([
+    # Mode bits: PICC only (0x04), Passive only (0x01) = 0x05
+    0x05,
+
+    # MIFARE params (Type 4 Tag)
+    0x04, 0x00,  # SENS_RES
+    0x12, 0x34, 0x56,  # NFCID1t (will be replaced)
+    0x40,  # SEL_RES (ISO14443-4 compliant)
+
+    # FeliCa params (18 bytes) - required but not used
+    0x01, 0xFE, 0xA2, 0xA3, 0xA4, 0xA5, 0xA6, 0xA7,
+    0xC0, 0xC1, 0xC2, 0xC3, 0xC4, 0xC5, 0xC6, 0xC7,
+    0xFF, 0xFF,
+
+    # NFCID3t (10 bytes)
+    0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0A,
+
+    # General bytes length (empty for now)
+    0x00,
+
+    # Historical bytes length (optional, none)
+    0x00,
+])
+
+now_ms = time.time_ns() // 1_000_000
 
 # Test payment request (you'll generate this from Node.js in production)
 payment_request = {
@@ -23,8 +59,8 @@ payment_request = {
         "currency": "USD",
         "fiatAmount": "5.00",
         "description": "Grande Latte",
-        "nonce": str(int(time.time() * 1000)),
-        "expiry": str(int((time.time() + 180) * 1000)),  # 3 minutes
+        "nonce": str(now_ms),
+        "expiry": str(now_ms + 180_000),  # 3 minutes
         "terminalId": "terminal_001"
     },
     "signature": "0x1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef1234"  # Mock signature for testing
@@ -52,18 +88,29 @@ def create_ndef_uri_message(uri):
     Create NDEF URI Record
     More universal - works with most NFC reader apps
     """
-    # URI identifier codes (0x00 = no prefix)
-    uri_payload = bytearray([0x00])  # No prefix
-    uri_payload.extend(uri.encode('utf-8'))
-
-    ndef_record = bytearray()
-    ndef_record.append(0xD1)  # Header
-    ndef_record.append(0x01)  # Type length
-    ndef_record.append(len(uri_payload))  # Payload length
-    ndef_record.append(0x55)  # Type = "U" (URI)
-    ndef_record.extend(uri_payload)
-
-    return bytes(ndef_record)
+    uri_bytes = uri.encode('utf-8')
+
+    # Payload is the identifier code plus the URI, so its length is known
+    # without building it first
+    return bytes((
+        0xD1,  # Header
+        0x01,  # Type length
+        len(uri_bytes) + 1,  # Payload length
+        0x55,  # Type = "U" (URI)
+        0x00,  # URI identifier code (0x00 = no prefix)
+    )) + uri_bytes
+
+def tg_get_data(pn532, timeout):
+    """TgGetData: returns the initiator's command, or None on timeout/error status"""
+    response = pn532.call_function(TG_GET_DATA, response_length=64, timeout=timeout)
+    if not response or response[0] != 0x00:
+        return None
+    return response[1:]
+
+def tg_set_data(pn532, data):
+    """TgSetData: send a response to the initiator; True if the PN532 reports success"""
+    response = pn532.call_function(TG_SET_DATA, params=data, response_length=1)
+    return bool(response) and response[0] == 0x00
 
 print("🔧 Writing Payment Request to NFC")
 print("="*60)
@@ -72,7 +119,7 @@ print("This will write a signed payment request that your phone can read\n")
 try:
     # Open serial port
     print("Opening serial port...")
-    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=1)
+    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=SERIAL_TIMEOUT)
     uart.dtr = False
     uart.rts = False
     time.sleep(0.2)
@@ -123,91 +170,62 @@ try:
     print("(Use any NFC reader app - NFC Tools, NFC TagInfo, etc.)")
     print("(Press Ctrl+C to stop)\n")
 
-    # Card emulation parameters
-    # Mode bits: PICC only (0x04), Passive only (0x01) = 0x05
-    mode = 0x05
-
-    # MIFARE params (Type 4 Tag)
-    mifare_params = bytearray([
-        0x04, 0x00,  # SENS_RES
-        0x12, 0x34, 0x56,  # NFCID1t (will be replaced)
-        0x40  # SEL_RES (ISO14443-4 compliant)
-    ])
-
-    # General bytes (empty for now)
-    general_bytes = bytearray([])
-
-    # Historical bytes (optional)
-    historical_bytes = bytearray([])
-
-    # Prepare full data with NDEF
-    # Note: This is simplified - full implementation needs proper Type 4 Tag formatting
-    target_data = bytearray()
-    target_data.extend(mifare_params)
-    target_data.extend([len(general_bytes)])
-    target_data.extend(general_bytes)
-    target_data.extend([len(historical_bytes)])
-    target_data.extend(historical_bytes)
-
     timeout_counter = 0
     max_timeout = 60  # 60 seconds
 
-    while timeout_counter < max_timeout:
-        try:
-            # Call TgInitAsTarget
-            # This blocks until a phone initiates communication or timeout
-            response = pn532.TgInitAsTarget(
-                mode=mode,
-                mifare_params=bytes(mifare_params),
-                felica_params=b'\x01\xFE\xA2\xA3\xA4\xA5\xA6\xA7\xC0\xC1\xC2\xC3\xC4\xC5\xC6\xC7\xFF\xFF',
-                nfcid3t=b'\x01\x02\x03\x04\x05\x06\x07\x08\x09\x0A',
-                timeout=1
-            )
-
-            if response:
-                print("\n🎉 Phone detected!")
-                print(f"   Initiator mode: 0x{response[0]:02X}")
-                print(f"   Response: {response.hex()}\n")
-
-                # Try to send NDEF data
-                print("📤 Sending NDEF message to phone...")
-
-                # In a real implementation, you'd handle NDEF Select/Read commands
-                # For now, this demonstrates the connection works
-                # Full Type 4 Tag implementation requires handling APDU commands
-
-                try:
-                    # Wait for commands from phone
-                    received = pn532.TgGetData(timeout=2)
-                    if received:
-                        print(f"📥 Received from phone: {received.hex()}")
-
-                        # Send response (simplified - real implementation needs APDU handling)
-                        pn532.TgSetData(ndef_message[:20])  # Send first 20 bytes as test
-                        print("✅ Sent NDEF preview to phone")
-
-                except RuntimeError as e:
-                    print(f"   Phone disconnected: {e}")
-
-                print("\n✅ Connection established!")
-                print("   (Full NDEF transfer requires Type 4 Tag APDU implementation)")
-                print("\n💡 Next steps:")
-                print("   1. Implement full Type 4 Tag protocol")
-                print("   2. Or use simpler Type 2 Tag format")
-                print("   3. Or write to physical NFC tag first")
-
-                break
+    # Arm once, then let select() wake us when a phone activates the target
+    # instead of re-issuing a blocking TgInitAsTarget every second
+    armed = pn532.send_command(TG_INIT_AS_TARGET, params=TG_INIT_AS_TARGET_PARAMS, timeout=1)
+    if not armed:
+        print("   Error: TgInitAsTarget not acknowledged")
+
+    while armed and timeout_counter < max_timeout:
+        readable, _, _ = select.select([uart], [], [], LISTEN_POLL_S)
+        if not readable:
+            timeout_counter += 1
+            if timeout_counter % 10 == 0:
+                print(f"   Still waiting... ({timeout_counter}s)")
+            continue
 
+        try:
+            response = pn532.process_response(TG_INIT_AS_TARGET, response_length=64)
         except RuntimeError as e:
-            if "timeout" in str(e).lower():
-                timeout_counter += 1
-                if timeout_counter % 10 == 0:
-                    print(f"   Still waiting... ({timeout_counter}s)")
+            print(f"   Error: {e}")
+            break
+
+        if response:
+            print("\n🎉 Phone detected!")
+            print(f"   Initiator mode: 0x{response[0]:02X}")
+            print(f"   Response: {response.hex()}\n")
+
+            # Try to send NDEF data
+            print("📤 Sending NDEF message to phone...")
+
+            # In a real implementation, you'd handle NDEF Select/Read commands
+            # For now, this demonstrates the connection works
+            # Full Type 4 Tag implementation requires handling APDU commands
+
+            # Wait for commands from phone
+            received = tg_get_data(pn532, timeout=2)
+            if received:
+                print(f"📥 Received from phone: {received.hex()}")
+
+                # Send response (simplified - real implementation needs APDU handling)
+                if tg_set_data(pn532, ndef_message[:20]):  # Send first 20 bytes as test
+                    print("✅ Sent NDEF preview to phone")
             else:
-                print(f"   Error: {e}")
-                break
+                print("   Phone disconnected")
+
+            print("\n✅ Connection established!")
+            print("   (Full NDEF transfer requires Type 4 Tag APDU implementation)")
+            print("\n💡 Next steps:")
+            print("   1. Implement full Type 4 Tag protocol")
+            print("   2. Or use simpler Type 2 Tag format")
+            print("   3. Or write to physical NFC tag first")
+
+            break
 
-    if timeout_counter >= max_timeout:
+    if armed and timeout_counter >= max_timeout:
         print("\n⏱️  Timeout - no phone detected")
         print("\n💡 Troubleshooting:")
         print("   - Make sure phone NFC is enabled")
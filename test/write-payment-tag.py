@@ -25,6 +25,9 @@ from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+SERIAL_TIMEOUT = 0.1
+
+now_ms = time.time_ns() // 1_000_000
 
 # Payment request to write to tag
 payment = {
@@ -38,8 +41,8 @@ payment = {
         "cur": "USD",
         "fiat": "5.00",
         "desc": "Grande Latte",
-        "nonce": str(int(time.time() * 1000)),
-        "exp": str(int((time.time() + 180) * 1000)),
+        "nonce": str(now_ms),
+        "exp": str(now_ms + 180_000),
         "tid": "term_001"
     },
     "sig": "mockSignatureBase64=="
@@ -52,37 +55,28 @@ def create_ndef_text_record(text):
     """
     text_bytes = text.encode('utf-8')
 
-    record = bytearray()
-
-    # NDEF Record Header
-    # MB=1 (Message Begin), ME=1 (Message End), CF=0, SR=1 (Short Record), IL=0, TNF=001 (Well-known)
-    record.append(0xD1)
-
-    # Type Length (1 byte for 'T')
-    record.append(0x01)
-
     # Payload Length (text + 3 bytes for status/lang)
     payload_len = len(text_bytes) + 3
-    if payload_len < 256:
-        record.append(payload_len)
-    else:
+    if payload_len >= 256:
         # Use long form if needed
         print("⚠️  Warning: Text too long for short record format")
         return None
 
-    # Type: 'T' (Text)
-    record.append(0x54)
-
-    # Status byte: UTF-8 encoding (bit 7=0), language code length (bits 5-0 = 2)
-    record.append(0x02)
-
-    # Language code: 'en'
-    record.extend(b'en')
-
-    # Text payload
-    record.extend(text_bytes)
-
-    return bytes(record)
+    # Fixed-size header ahead of the text, so the record is built in one concatenation
+    return bytes((
+        # NDEF Record Header
+        # MB=1 (Message Begin), ME=1 (Message End), CF=0, SR=1 (Short Record), IL=0, TNF=001 (Well-known)
+        0xD1,
+        0x01,  # Type Length (1 byte for 'T')
+        payload_len,
+        0x54,  # Type: 'T' (Text)
+        0x02,  # Status byte: UTF-8 encoding (bit 7=0), language code length (bits 5-0 = 2)
+        0x65, 0x6E,  # Language code: 'en'
+    )) + text_bytes
+
+# CC bytes for NTAG213 (144 bytes usable)
+# E1 10 12 00 = Magic number, version 1.0, 144 bytes (0x12*8), read/write access
+NTAG213_CC = b'\xE1\x10\x12\x00'
 
 def write_ndef_to_tag(pn532, ndef_data):
     """
@@ -115,25 +109,14 @@ def write_ndef_to_tag(pn532, ndef_data):
         print(f"⚠️  Could not read tag: {e}")
         return False
 
-    # Build NDEF message with TLV structure
-    ndef_message = bytearray()
-
-    # TLV: Type (0x03 = NDEF Message)
-    ndef_message.append(0x03)
-
-    # TLV: Length
+    # TLV: Length (3-byte form for 255 bytes and up)
     if len(ndef_data) < 255:
-        ndef_message.append(len(ndef_data))
+        length = bytes((len(ndef_data),))
     else:
-        ndef_message.append(0xFF)
-        ndef_message.append((len(ndef_data) >> 8) & 0xFF)
-        ndef_message.append(len(ndef_data) & 0xFF)
+        length = bytes((0xFF, (len(ndef_data) >> 8) & 0xFF, len(ndef_data) & 0xFF))
 
-    # TLV: Value (NDEF data)
-    ndef_message.extend(ndef_data)
-
-    # TLV: Terminator
-    ndef_message.append(0xFE)
+    # NDEF Message TLV (0x03) + data + Terminator TLV (0xFE), in one allocation
+    ndef_message = b''.join((b'\x03', length, ndef_data, b'\xFE'))
 
     print(f"   NDEF message size: {len(ndef_message)} bytes")
 
@@ -141,37 +124,36 @@ def write_ndef_to_tag(pn532, ndef_data):
     # NTAG pages are 4 bytes each
     # Page 4: Capability Container (usually pre-written, but we'll set it)
 
-    # CC bytes for NTAG213 (144 bytes usable)
-    # E1 10 12 00 = Magic number, version 1.0, 144 bytes (0x12*8), read/write access
-    cc = bytes([0xE1, 0x10, 0x12, 0x00])
-
     try:
-        # Write CC to page 4
-        pn532.ntag2xx_write_block(4, cc)
-        print(f"   ✅ Wrote CC to page 4")
+        # Write CC to page 4, unless the read above shows it is already there
+        # (saves a write cycle from the page's endurance budget)
+        if page_4 == NTAG213_CC:
+            print("   ✅ CC already on page 4")
+        else:
+            pn532.ntag2xx_write_block(4, NTAG213_CC)
+            print(f"   ✅ Wrote CC to page 4")
 
         # Write NDEF message starting at page 5
-        # Break into 4-byte chunks
-        page = 5
-        offset = 0
+        # Pad to whole pages in one step; memoryview slices hand out each page without copying
+        padded = memoryview(ndef_message + bytes((-len(ndef_message)) & 3))
 
-        while offset < len(ndef_message):
-            chunk = ndef_message[offset:offset+4]
+        # NTAG213 has 45 pages (0-44), usable pages 4-39
+        last_page = min(5 + len(padded) // 4, 40)
 
-            # Pad with zeros if needed
-            if len(chunk) < 4:
-                chunk = chunk + bytes([0x00] * (4 - len(chunk)))
+        write_block = pn532.ntag2xx_write_block
+        for page in range(5, last_page):
+            offset = (page - 5) * 4
+            chunk = padded[offset:offset+4]
 
-            pn532.ntag2xx_write_block(page, chunk)
-            print(f"   ✅ Wrote page {page}: {chunk.hex()}")
+            write_block(page, chunk)
+            # Only print first few and last few pages to reduce spam
+            if page < 8 or page >= last_page - 2:
+                print(f"   ✅ Wrote page {page}: {chunk.hex()}")
+            elif page == 8:
+                print(f"   ... (writing pages 8 to {last_page - 3}) ...")
 
-            page += 1
-            offset += 4
-
-            # NTAG213 has 45 pages (0-44), usable pages 4-39
-            if page > 39:
-                print("⚠️  Tag full!")
-                break
+        if len(padded) > (last_page - 5) * 4:
+            print("⚠️  Tag full!")
 
         print(f"\n✅ Successfully wrote {len(ndef_data)} bytes to tag!")
         return True
@@ -193,12 +175,17 @@ try:
     uart = serial.Serial(
         PORT,
         BAUDRATE,
-        timeout=1,
+        timeout=SERIAL_TIMEOUT,
         rtscts=False,
         dsrdtr=False,
         xonxoff=False
     )
 
+    try:
+        uart.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass
+
     uart.dtr = False
     uart.rts = False
     time.sleep(0.2)
@@ -212,55 +199,66 @@ try:
     print(f"   ✅ SAM configured")
     print()
 
-    # Prepare payment
-    print("Step 2: Preparing payment request...")
+    # The PN532 session stays up between tags, so each rewrite skips the
+    # port open, firmware query and SAM configuration
+    while True:
+        # Prepare payment
+        print("Step 2: Preparing payment request...")
 
-    payment_json = json.dumps(payment, separators=(',', ':'))
-    print(f"   Payment: {payment_json[:60]}...")
-    print(f"   Size: {len(payment_json)} bytes")
-    print()
-
-    # Create NDEF record
-    ndef_record = create_ndef_text_record(payment_json)
-
-    if not ndef_record:
-        print("❌ Failed to create NDEF record")
-        uart.close()
-        exit(1)
-
-    print(f"   NDEF record: {len(ndef_record)} bytes")
-    print(f"   Preview: {ndef_record[:20].hex()}...")
-    print()
+        payment_json = json.dumps(payment, separators=(',', ':'))
+        print(f"   Payment: {payment_json[:60]}...")
+        print(f"   Size: {len(payment_json)} bytes")
+        print()
 
-    # Write to tag
-    print("Step 3: Writing to NFC tag...")
-    print("=" * 60)
+        # Create NDEF record
+        ndef_record = create_ndef_text_record(payment_json)
 
-    success = write_ndef_to_tag(pn532, ndef_record)
+        if not ndef_record:
+            print("❌ Failed to create NDEF record")
+            uart.close()
+            exit(1)
 
-    if success:
+        print(f"   NDEF record: {len(ndef_record)} bytes")
+        print(f"   Preview: {ndef_record[:20].hex()}...")
         print()
+
+        # Write to tag
+        print("Step 3: Writing to NFC tag...")
         print("=" * 60)
-        print("✅ PAYMENT TAG READY!")
-        print("=" * 60)
-        print()
-        print("📱 Customer can now tap their phone to read payment")
-        print()
-        print("To write another payment:")
-        print("  1. Update payment details in script")
-        print("  2. Run script again")
-        print("  3. Place same tag on reader")
-        print()
-    else:
-        print()
-        print("❌ Failed to write tag")
-        print()
-        print("Troubleshooting:")
-        print("  - Ensure you have NTAG213/215/216 tags")
-        print("  - Tag must be blank or writable")
-        print("  - Keep tag on reader during entire write")
+
+        success = write_ndef_to_tag(pn532, ndef_record)
+
+        if success:
+            print()
+            print("=" * 60)
+            print("✅ PAYMENT TAG READY!")
+            print("=" * 60)
+            print()
+            print("📱 Customer can now tap their phone to read payment")
+            print()
+            print("To write another payment, place the next tag (or the same one)")
+            print("on the reader and press Enter; the nonce and expiry are renewed.")
+            print()
+        else:
+            print()
+            print("❌ Failed to write tag")
+            print()
+            print("Troubleshooting:")
+            print("  - Ensure you have NTAG213/215/216 tags")
+            print("  - Tag must be blank or writable")
+            print("  - Keep tag on reader during entire write")
+            print()
+
+        try:
+            input("Press Enter to write the next tag (Ctrl+C to quit)...")
+        except EOFError:
+            break
         print()
 
+        # Fresh request for the next tag
+        now_ms = time.time_ns() // 1_000_000
+        payment["req"]["nonce"], payment["req"]["exp"] = str(now_ms), str(now_ms + 180_000)
+
 except KeyboardInterrupt:
     print("\n\n⚠️  Cancelled by user")
 
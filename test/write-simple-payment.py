@@ -5,11 +5,14 @@ Tests actual data exchange, not just detection
 """
 import serial
 import json
+import select
 import time
 from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+SERIAL_TIMEOUT = 0.1
+LISTEN_POLL_S = 1.0  # select() window while armed for a target
 
 # Simple payment request
 payment = {
@@ -24,7 +27,13 @@ print("="*60)
 
 try:
     # Setup
-    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=1)
+    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=SERIAL_TIMEOUT)
+
+    try:
+        uart.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass
+
     uart.dtr = False
     uart.rts = False
     time.sleep(0.2)
@@ -40,13 +49,38 @@ try:
     print(payment_json)
     print()
 
+    # Encode once and cut the fixed-size blocks up front: the payload is the
+    # same for every tap. Slicing the bytes (not the str) keeps each block at
+    # exactly 16 / 4 bytes even if the JSON holds multi-byte characters
+    payment_bytes = payment_json.encode('utf-8')
+    mifare_block = payment_bytes[:16].ljust(16, b'\x00')  # Mifare Classic block
+    ntag_page = payment_bytes[:4].ljust(4, b'\x00')  # NTAG page
+
     print("="*60)
     print("📱 TAP YOUR PHONE")
     print("="*60)
     print("Will attempt to send payment data when detected\n")
 
+    # Arm InListPassiveTarget once: the PN532 polls for a target in firmware
+    # and only answers on the UART when one enters the field, so select()
+    # replaces re-issuing read_passive_target() and sleeping between tries
+    armed = False
+
+    # Older adafruit_pn532 releases lack the NTAG helpers; check once, not per tap
+    has_ntag = hasattr(pn532, 'ntag2xx_read_block')
+
     while True:
-        uid = pn532.read_passive_target(timeout=0.5)
+        if not armed:
+            armed = pn532.listen_for_passive_target(timeout=1)
+            if not armed:
+                continue
+
+        readable, _, _ = select.select([uart], [], [], LISTEN_POLL_S)
+        if not readable:
+            continue
+
+        armed = False
+        uid = pn532.get_passive_target(timeout=1)
 
         if uid:
             uid_hex = uid.hex().upper()
@@ -71,12 +105,9 @@ try:
                         print("   ✅ Mifare authentication successful!")
 
                         # Try to write data
-                        data = payment_json[:16].encode('utf-8')
-                        data = data.ljust(16, b'\x00')  # Pad to 16 bytes
-
                         try:
-                            pn532.mifare_classic_write_block(4, data)
-                            print(f"   ✅ Wrote data: {data[:16]}")
+                            pn532.mifare_classic_write_block(4, mifare_block)
+                            print(f"   ✅ Wrote data: {mifare_block}")
                             print("   📱 Try reading with NFC Tools app!")
 
                         except Exception as e:
@@ -89,25 +120,23 @@ try:
                     print(f"   ℹ️  Not a Mifare Classic: {e}")
 
                 # Try NTAG/Ultralight commands
-                try:
-                    print("   Trying NTAG/Ultralight read...")
-                    # Read page 4 (user data starts here)
-                    data = pn532.ntag2xx_read_block(4)
-                    if data:
-                        print(f"   📖 Current data on page 4: {data.hex()}")
-
-                        # Try to write
-                        write_data = payment_json[:4].encode('utf-8')
-                        write_data = write_data.ljust(4, b'\x00')
-
-                        pn532.ntag2xx_write_block(4, write_data)
-                        print(f"   ✅ Wrote to NTAG: {write_data.hex()}")
-                        print("   📱 Read with NFC Tools app to verify!")
-
-                except AttributeError:
+                if not has_ntag:
                     print("   ℹ️  NTAG commands not available in this library version")
-                except Exception as e:
-                    print(f"   ℹ️  Not an NTAG: {e}")
+                else:
+                    try:
+                        print("   Trying NTAG/Ultralight read...")
+                        # Read page 4 (user data starts here)
+                        data = pn532.ntag2xx_read_block(4)
+                        if data:
+                            print(f"   📖 Current data on page 4: {data.hex()}")
+
+                            # Try to write
+                            pn532.ntag2xx_write_block(4, ntag_page)
+                            print(f"   ✅ Wrote to NTAG: {ntag_page.hex()}")
+                            print("   📱 Read with NFC Tools app to verify!")
+
+                    except Exception as e:
+                        print(f"   ℹ️  Not an NTAG: {e}")
 
             elif len(uid) == 7:
                 print("   Type: 7-byte UID (Modern NFC tag or phone)")
@@ -122,8 +151,6 @@ try:
 
             time.sleep(2)
 
-        time.sleep(0.1)
-
 except KeyboardInterrupt:
     print("\n✅ Test stopped")
     if 'uart' in locals():
@@ -5,11 +5,16 @@ Easier to test than card emulation - just needs a blank NFC tag
 """
 import serial
 import json
+import select
 import time
 from adafruit_pn532.uart import PN532_UART
 
 PORT = '/dev/tty.usbserial-ABSCDY4Z'
 BAUDRATE = 115200
+SERIAL_TIMEOUT = 0.1
+LISTEN_POLL_S = 1.5  # select() window per attempt while armed for a tag
+
+now_ms = time.time_ns() // 1_000_000
 
 # Test payment request
 payment_request = {
@@ -22,8 +27,8 @@ payment_request = {
         "currency": "USD",
         "fiatAmount": "5.00",
         "description": "Grande Latte",
-        "nonce": str(int(time.time() * 1000)),
-        "expiry": str(int((time.time() + 180) * 1000))
+        "nonce": str(now_ms),
+        "expiry": str(now_ms + 180_000)
     },
     "signature": "0x1234...abcd"  # Mock for testing
 }
@@ -34,7 +39,13 @@ print("This writes to a blank NFC tag (NTAG213, Mifare Classic, etc.)\n")
 
 try:
     # Open serial
-    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=1)
+    uart = serial.Serial(PORT, baudrate=BAUDRATE, timeout=SERIAL_TIMEOUT)
+
+    try:
+        uart.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass
+
     uart.dtr = False
     uart.rts = False
     time.sleep(0.2)
@@ -62,9 +73,20 @@ try:
     tag_found = False
     attempts = 0
 
+    # Arm InListPassiveTarget once and let select() wake us when the PN532
+    # reports a tag, instead of a timed read followed by a sleep per attempt
+    armed = False
+
     while not tag_found and attempts < 30:
-        # Try to read a tag (any type)
-        uid = pn532.read_passive_target(timeout=0.5)
+        if not armed:
+            armed = pn532.listen_for_passive_target(timeout=1)
+
+        uid = None
+        if armed:
+            readable, _, _ = select.select([uart], [], [], LISTEN_POLL_S)
+            if readable:
+                armed = False
+                uid = pn532.get_passive_target(timeout=1)
 
         if uid:
             print(f"\n🎉 Tag detected!")
@@ -107,7 +129,6 @@ try:
             attempts += 1
             if attempts % 5 == 0:
                 print(f"   Still waiting... ({attempts}/30)")
-            time.sleep(1)
 
     if not tag_found:
         print("\n⏱️  No tag detected")